@@ -0,0 +1,91 @@
+"""
+Measures the per request overhead of the error handling middleware.
+Compares the previous BaseHTTPMiddleware implementation with the pure ASGI one.
+
+Run from the backend directory with the application environment loaded:
+    python -m benchmarks.exception_middleware
+"""
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.requests import Request
+from fastapi.responses import StreamingResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from src.config.middlewares.exception_handler import (
+    AppExceptionHandler,
+    ExceptionHandlerMiddleware,
+)
+from src.libs import exceptions
+
+REQUESTS = 5000
+
+
+class BaseHTTPExceptionHandlerMiddleware(BaseHTTPMiddleware):
+    """Previous implementation, kept here as the baseline"""
+
+    async def dispatch(self, request: Request, call_next):
+        try:
+            return await call_next(request)
+        except Exception as e:
+            return AppExceptionHandler(e).raise_exception()
+
+
+def build_app(middleware_klass=None) -> FastAPI:
+    app = FastAPI()
+    if middleware_klass is BaseHTTPExceptionHandlerMiddleware:
+        app.add_middleware(middleware_klass)
+    elif middleware_klass is not None:
+        app.add_middleware(middleware_klass, some_attribute="benchmark")
+
+    @app.get("/ok")
+    async def ok():
+        return {"message": "pong"}
+
+    @app.get("/error")
+    async def error():
+        raise exceptions.NotFoundException("Not found")
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse(iter([b"x" * 1024] * 64), media_type="image/png")
+
+    return app
+
+
+async def measure(app: FastAPI, path: str) -> float:
+    async with httpx.AsyncClient(app=app, base_url="http://benchmark") as client:
+        for _ in range(500):
+            await client.get(path)
+        started = time.perf_counter()
+        for _ in range(REQUESTS):
+            await client.get(path)
+        return (time.perf_counter() - started) / REQUESTS * 1_000_000
+
+
+async def main():
+    apps = {
+        "none": build_app(),
+        "base_http": build_app(BaseHTTPExceptionHandlerMiddleware),
+        "pure_asgi": build_app(ExceptionHandlerMiddleware),
+    }
+    for path in ("/ok", "/stream", "/error"):
+        # without a handler the error escapes the app, so it has no baseline
+        results = {
+            name: await measure(app, path)
+            for name, app in apps.items()
+            if not (name == "none" and path == "/error")
+        }
+        baseline = results.get("none")
+        print(f"{path}")
+        for name, per_request in results.items():
+            overhead = (
+                f" (+{per_request - baseline:6.1f} us overhead)" if baseline else ""
+            )
+            print(f"  {name:<10} {per_request:8.1f} us/request{overhead}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+"""
+Measures the per request CPU time of serializing room reads.
+Compares the validated path (repository model, service response model, response
+schema and response_model) with the raw document path used by the read endpoints.
+Documents are served from memory so only serialization is measured, and both
+paths are checked to return the same JSON before they are timed.
+
+Run from the backend directory with the application environment loaded:
+    python -m benchmarks.read_serialization
+"""
+import asyncio
+import time
+
+import httpx
+from bson import ObjectId
+from fastapi import FastAPI
+
+from src.apps.rooms import models, schema
+from src.libs import DefaultResponse, ResponseStatus
+
+REQUESTS = 2000
+PAGE_SIZE = 50
+
+
+class RoomResponseSchema(schema.RoomResponseSchema):
+    # the response_model needs the encoders to serialize ObjectIds on this path
+    class Config:
+        json_encoders = {ObjectId: str}
+
+
+def build_document() -> dict:
+    devices = [ObjectId() for _ in range(5)]
+    return models.RoomModel(
+        name="benchmark", devices=devices, created_by=devices[0]
+    ).dict(by_alias=True)
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    document = build_document()
+    documents = [build_document() for _ in range(PAGE_SIZE)]
+
+    @app.get("/validated/room", response_model=RoomResponseSchema)
+    async def validated_room():
+        db_result = models.RoomModel(**document)
+        room = models.RoomModel(**db_result.dict())
+        return RoomResponseSchema(
+            status=ResponseStatus.SUCCESS, message="Room", data=room
+        )
+
+    @app.get("/raw/room", responses={200: {"model": schema.RoomResponseSchema}})
+    async def raw_room():
+        response = DefaultResponse(status=ResponseStatus.SUCCESS, message="Room")
+        return response.document_response(document)
+
+    @app.get("/validated/rooms", response_model=schema.PaginatedRoomSchema)
+    async def validated_rooms():
+        db_results = [models.RoomModel(**result) for result in documents]
+        rooms = [models.RoomModel(**result.dict()) for result in db_results]
+        return schema.PaginatedRoomSchema(
+            status=ResponseStatus.SUCCESS,
+            message="Rooms",
+            data=rooms,
+            total_count=PAGE_SIZE,
+            page=1,
+            size=PAGE_SIZE,
+        )
+
+    @app.get("/raw/rooms", responses={200: {"model": schema.PaginatedRoomSchema}})
+    async def raw_rooms():
+        response = schema.PaginatedRoomSchema(
+            status=ResponseStatus.SUCCESS,
+            message="Rooms",
+            data=[],
+            total_count=PAGE_SIZE,
+            page=1,
+            size=PAGE_SIZE,
+        )
+        return response.document_response(documents)
+
+    return app
+
+
+async def measure(client: httpx.AsyncClient, path: str) -> float:
+    for _ in range(200):
+        await client.get(path)
+    started = time.process_time()
+    for _ in range(REQUESTS):
+        await client.get(path)
+    return (time.process_time() - started) / REQUESTS * 1_000_000
+
+
+async def check_parity(client: httpx.AsyncClient, endpoint: str) -> None:
+    validated = (await client.get(f"/validated/{endpoint}")).json()
+    raw = (await client.get(f"/raw/{endpoint}")).json()
+    if validated != raw:
+        raise AssertionError(f"GET {endpoint} returns different JSON on the raw path")
+
+
+async def main():
+    app = build_app()
+    async with httpx.AsyncClient(app=app, base_url="http://benchmark") as client:
+        for endpoint in ("room", "rooms"):
+            await check_parity(client, endpoint)
+            results = {
+                path: await measure(client, f"/{path}/{endpoint}")
+                for path in ("validated", "raw")
+            }
+            print(f"GET {endpoint} ({PAGE_SIZE if endpoint == 'rooms' else 1} docs)")
+            for path, per_request in results.items():
+                print(f"  {path:<10} {per_request:8.1f} us cpu/request")
+            print(f"  speedup    {results['validated'] / results['raw']:8.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""
+Measures how many text messages a single worker accepts per second through
+POST /messages/text, from request parsing to the event outbox, for a device
+publishing to a room it is a member of. The device token and its room membership
+are resolved from cache, as on the hot path, and the emitter is replaced so only
+the worker is measured, not centrifugo.
+
+Target: at least 2000 messages/second per worker.
+
+Run from the backend directory with the application environment loaded:
+    python -m benchmarks.text_publish
+"""
+import asyncio
+import hashlib
+import time
+
+import orjson
+from bson import ObjectId
+from fastapi import FastAPI
+
+from src.apps import auth, messages
+from src.apps.rooms import RoomRepository
+from src.config.dependencies.auth import principal_cache
+from src.libs import event_outbox
+
+MESSAGES = 5000
+CONCURRENCY = 50
+TARGET = 2000  # messages/second per worker
+PATH = "/messages/text"
+
+
+class NullEmitter:
+    """Accepts every publish, so delivery costs nothing"""
+
+    async def publish(self, channel, event, data):
+        return data
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(messages.message_router)
+    return app
+
+
+def cache_device(device_id: ObjectId, room_id: ObjectId) -> bytes:
+    """Caches a principal for a device in a room, returning its token.
+    The token is never decoded and the database is never queried"""
+    token = f"benchmark-{device_id}"
+    principal = auth.UserTokenSchema(
+        _id=ObjectId(), email="benchmark@example.com", device_id=device_id
+    )
+    principal_cache.set(hashlib.sha256(token.encode()).digest(), principal)
+    RoomRepository.member_cache.set((room_id, device_id), True, tags=[room_id])
+    return f"Bearer {token}".encode()
+
+
+async def publish(app: FastAPI, authorization: bytes, room_id: str, count: int):
+    # the app is called directly, so no http client or server time is measured
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": PATH,
+        "raw_path": PATH.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"authorization", authorization),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("benchmark", 80),
+    }
+    for index in range(count):
+        body = orjson.dumps({"room_id": room_id, "message": f"clip {index}"})
+        statuses = []
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+
+        await app(dict(scope), receive, send)
+        if statuses != [202]:
+            raise RuntimeError(f"Publish failed with status {statuses}")
+
+
+async def main():
+    room_id, device_id = ObjectId(), ObjectId()
+    authorization = cache_device(device_id, room_id)
+    event_outbox.emitter = NullEmitter()
+    await event_outbox.start()
+    app = build_app()
+    await publish(app, authorization, str(room_id), 500)
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            publish(app, authorization, str(room_id), MESSAGES // CONCURRENCY)
+            for _ in range(CONCURRENCY)
+        )
+    )
+    elapsed = time.perf_counter() - started
+    await event_outbox.stop()
+    rate = MESSAGES / elapsed
+    stats = event_outbox.stats()
+    print(f"POST {PATH} ({CONCURRENCY} concurrent publishers)")
+    print(f"  accepted   {rate:8.0f} messages/second")
+    print(f"  latency    {elapsed / MESSAGES * 1_000_000:8.1f} us/message")
+    print(f"  delivered  {stats['delivered']:8d} of {stats['enqueued']}")
+    result = "met" if rate >= TARGET else "missed"
+    print(f"  target     {TARGET:8d} messages/second {result}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -4,6 +4,7 @@ from fastapi import Depends, Header
 from fastapi.routing import APIRouter
 
 from src.config.dependencies.database import get_database
+from src.libs import utils
 
 from . import schema, service
 
@@ -18,6 +19,8 @@ async def login_user(
 ):
     auth_service = service.AuthService(database)
     login_response = await auth_service.login(
-        email=user_login_request.email, password=user_login_request.password
+        email=user_login_request.email,
+        password=user_login_request.password,
+        device_info=utils.parse_user_agent(user_agent),
     )
     return login_response
@@ -4,7 +4,7 @@ from fastapi.encoders import jsonable_encoder
 from pymongo.collection import Collection
 from pydantic import EmailStr
 
-from src.libs import exceptions, utils
+from src.libs import exceptions, password_hasher, utils
 from src.apps import users
 from . import schema
 
@@ -17,7 +17,7 @@ class AuthService:
 
     def __init__(self, database):
         self.database = database
-        self.users_collection: Collection = database[self.USERS_COLLECTION_NAME]
+        self.users_collection: Collection = database[users.USER_DB_COLLLECTION_NAME]
 
     async def login(
         self, email: EmailStr, password: str, device_info: dict[str, Any]
@@ -27,6 +27,7 @@ class AuthService:
         Args:
             email (EmailStr): email address of user
             password (str): password of user
+            device_info (dict[str, Any]): details of the device logging in
 
         Raises:
             exceptions.BadRequest: When Email Address is not found
@@ -40,8 +41,17 @@ class AuthService:
         if not user_db:
             raise exceptions.BadRequest("User with email address not found")
         user = users.UserModel(**user_db)
-        if not utils.verify_hash(user.password, password):
+        verified, new_hash = await password_hasher.verify_and_update(
+            user.password, password
+        )
+        if not verified:
             raise exceptions.BadRequest("Invalid Password")
+        if new_hash is not None:
+            # the stored hash was made with outdated scheme parameters
+            await self.users_collection.update_one(
+                {"_id": user.id, "password": user.password},
+                {"$set": {"password": new_hash}},
+            )
         user_data = jsonable_encoder(user)
         device_instance = users.DeviceCreateSchema(**device_info, user_id=user.id)
         device = await users.DeviceService(self.database).get_create(device_instance)
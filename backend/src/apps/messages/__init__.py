@@ -0,0 +1 @@
+from .api import router as message_router
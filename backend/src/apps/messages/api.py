@@ -0,0 +1,189 @@
+from typing import Optional
+
+from fastapi import Depends, Header, Query, status
+from fastapi.requests import Request
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRouter
+
+from src.config.dependencies import AuthDependency, get_database
+from src.apps.auth.schema import UserTokenSchema
+from src.apps.rooms import utils as session_utils
+from src.libs import DefaultResponse, PyObjectId, ResponseStatus, file_response
+from src.libs.file_storage import FileSystem
+
+from . import constants, schema, service, utils
+
+router = APIRouter(prefix="/messages")
+
+
+@router.post(
+    path="/media",
+    response_model=schema.MediaUploadResponseSchema,
+    status_code=status.HTTP_201_CREATED,
+)
+async def upload_media(
+    request: Request,
+    file_name: str = Query(default="media"),
+    content_type: Optional[str] = Header(default=None),
+    auth: UserTokenSchema = Depends(AuthDependency()),
+    database=Depends(get_database),
+):
+    """
+    Stores the raw request body as a media file, chunk by chunk as it is received.
+    Content that is already stored is not stored again
+    """
+    media = await service.MediaService(database).store(
+        file_name,
+        request.stream(),
+        str(auth.device_id),
+        content_type=content_type,
+        max_size=constants.UPLOAD_MAX_SIZE,
+    )
+    return schema.MediaUploadResponseSchema(
+        status=ResponseStatus.SUCCESS,
+        message="Media successfully uploaded",
+        data=media,
+    )
+
+
+@router.get(
+    path="/media/{media_id}",
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+)
+async def download_media(
+    media_id: PyObjectId,
+    request: Request,
+    sender: schema.MessageSender = Depends(utils.get_message_sender),
+    database=Depends(get_database),
+):
+    """
+    Streams media sent by the caller, or published to a room or session the caller
+    is a member of, under the name and media type it was sent with.
+    Single byte ranges are answered with 206 partial content
+    """
+    media = await service.MediaService(database).get_media(media_id, sender)
+    return await file_response(
+        request,
+        FileSystem(database),
+        media.file_id,
+        media_type=media.content_type,
+        file_name=media.file_name,
+        etag=f'"{media.id}"',
+    )
+
+
+@router.post(
+    path="/uploads",
+    response_model=schema.UploadResponseSchema,
+    status_code=status.HTTP_201_CREATED,
+)
+async def create_upload(
+    upload_data: schema.UploadCreateSchema,
+    sender: schema.MessageSender = Depends(utils.get_message_sender),
+    database=Depends(get_database),
+):
+    """
+    Starts a resumable media upload to a room, or to the session of the sender.
+    Chunks are then sent with PUT /uploads/{id_}/chunks/{index}
+    """
+    channel = await utils.resolve_channel(database, sender, upload_data.room_id)
+    upload_service = service.UploadService(database)
+    upload = await upload_service.create(upload_data, sender, channel)
+    return schema.UploadResponseSchema(
+        status=ResponseStatus.SUCCESS,
+        message="Upload successfully created",
+        data=upload_service.to_status(upload),
+    )
+
+
+@router.get(
+    path="/uploads/{id_}",
+    response_model=schema.UploadResponseSchema,
+    status_code=status.HTTP_200_OK,
+)
+async def get_upload(
+    id_: PyObjectId,
+    sender: schema.MessageSender = Depends(utils.get_message_sender),
+    database=Depends(get_database),
+):
+    """
+    Reports the received offset and missing chunk ranges, to resume an upload
+    """
+    upload_service = service.UploadService(database)
+    upload = await upload_service.get_upload(id_, sender)
+    return schema.UploadResponseSchema(
+        status=ResponseStatus.SUCCESS,
+        message="Upload successfully retrieved",
+        data=upload_service.to_status(upload),
+    )
+
+
+@router.put(
+    path="/uploads/{id_}/chunks/{index}",
+    response_model=schema.UploadResponseSchema,
+    status_code=status.HTTP_200_OK,
+)
+async def put_upload_chunk(
+    id_: PyObjectId,
+    index: int,
+    request: Request,
+    sender: schema.MessageSender = Depends(utils.get_message_sender),
+    database=Depends(get_database),
+):
+    """
+    Stores chunk number index, from 0, sent as the raw request body.
+    Chunks can be sent in parallel and in any order
+    """
+    data = await utils.read_body(request, constants.UPLOAD_MAX_CHUNK_SIZE)
+    upload_service = service.UploadService(database)
+    upload = await upload_service.put_chunk(id_, sender, index, data)
+    return schema.UploadResponseSchema(
+        status=ResponseStatus.SUCCESS,
+        message="Chunk successfully received",
+        data=upload_service.to_status(upload),
+    )
+
+
+@router.post(
+    path="/uploads/{id_}/finalize",
+    response_model=schema.UploadResponseSchema,
+    status_code=status.HTTP_200_OK,
+)
+async def finalize_upload(
+    id_: PyObjectId,
+    sender: schema.MessageSender = Depends(utils.get_message_sender),
+    database=Depends(get_database),
+):
+    """
+    Stores the uploaded media once every chunk is received and publishes it
+    """
+    upload_service = service.UploadService(database)
+    upload = await upload_service.finalize(id_, sender)
+    return schema.UploadResponseSchema(
+        status=ResponseStatus.SUCCESS,
+        message="Media message successfully published",
+        data=upload_service.to_status(upload),
+    )
+
+
+@router.post(
+    path="/text",
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={status.HTTP_202_ACCEPTED: {"model": DefaultResponse}},
+)
+async def publish_text_message(
+    message_data: schema.TextMessageCreateSchema,
+    sender: schema.MessageSender = Depends(utils.get_message_sender),
+    database=Depends(get_database),
+):
+    """
+    Publishes a text message to a room, or to the session of the sender.
+    The message is delivered after the response
+    """
+    channel = await utils.resolve_channel(database, sender, message_data.room_id)
+    data = await session_utils.publish_text_message(
+        channel, sender.id, sender.username, message_data.message
+    )
+    response = DefaultResponse(status=ResponseStatus.SUCCESS, message="Message sent")
+    return response.document_response(data, status_code=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,12 @@
+MEDIA_DB_COLLECTION_NAME = "MEDIA"
+UPLOAD_DB_COLLECTION_NAME = "UPLOADS"
+UPLOAD_CHUNK_DB_COLLECTION_NAME = "UPLOAD_CHUNKS"
+UPLOAD_DEFAULT_CHUNK_SIZE = 1024 * 1024  # bytes
+UPLOAD_MIN_CHUNK_SIZE = 64 * 1024  # bytes, only the last chunk can be shorter
+UPLOAD_MAX_CHUNKS = 10_000  # keeps received chunk indexes small in the upload
+UPLOAD_MAX_CHUNK_SIZE = (
+    8 * 1024 * 1024
+)  # bytes, kept well under the bson document limit
+UPLOAD_MAX_SIZE = 512 * 1024 * 1024  # bytes
+UPLOAD_TTL = 24 * 60 * 60  # seconds an unfinished upload can be resumed
+UPLOAD_FINALIZE_TIMEOUT = 15 * 60  # seconds before a stuck finalize can be retried
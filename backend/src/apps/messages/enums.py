@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class UploadStatus(str, Enum):
+    PENDING = "PENDING"
+    FINALIZING = "FINALIZING"
+    STORED = "STORED"  # media stored, its message not published yet
+    COMPLETED = "COMPLETED"
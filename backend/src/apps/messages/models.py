@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import Field
+
+from src.libs import DbModel, PyObjectId
+
+from .enums import UploadStatus
+
+
+class MediaModel(DbModel):
+    """
+    A media file as sent by one sender.
+    Its content is stored once per sha256 and shared between uploads, so the name
+    and media type each sender gave it are kept here instead.
+    """
+
+    file_id: PyObjectId  # content addressed file holding the bytes
+    file_name: str
+    content_type: Optional[str] = None
+    length: int
+    sha256: str
+    sender_id: str  # device or session user that sent the media
+    channel: Optional[str] = None  # room or session the media is published to
+
+
+class UploadModel(DbModel):
+    """
+    A resumable upload of a media message.
+    Chunks are received in any order, and the media is stored once all are received.
+    """
+
+    channel: str  # room or session the media is published to
+    sender_id: str  # device or session user uploading the media
+    file_name: str
+    content_type: Optional[str] = None
+    total_size: int
+    chunk_size: int
+    total_chunks: int
+    received_chunks: list[int] = Field(default_factory=list)
+    status: UploadStatus = Field(default=UploadStatus.PENDING)
+    media_id: Optional[PyObjectId] = None
+    sha256: Optional[str] = None
+    expires_at: Optional[datetime]  # none while finalizing or stored, so it is kept
+
+
+class UploadChunkModel(DbModel):
+    upload_id: PyObjectId
+    index: int
+    data: bytes
+    expires_at: Optional[datetime]
@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from bson import Binary, ObjectId
+from pymongo import ASCENDING, IndexModel
+
+from src.libs import BaseRepository
+from . import models, constants
+
+
+class MediaRepository(BaseRepository):
+    model_klass = models.MediaModel
+    collection_name = constants.MEDIA_DB_COLLECTION_NAME
+
+
+class UploadRepository(BaseRepository):
+    model_klass = models.UploadModel
+    collection_name = constants.UPLOAD_DB_COLLECTION_NAME
+    indexes = [
+        # unfinished uploads are removed once they expire
+        IndexModel([("expires_at", ASCENDING)], name="expires_at", expireAfterSeconds=0)
+    ]
+
+
+class UploadChunkRepository(BaseRepository):
+    model_klass = models.UploadChunkModel
+    collection_name = constants.UPLOAD_CHUNK_DB_COLLECTION_NAME
+    indexes = [
+        IndexModel(
+            [("upload_id", ASCENDING), ("index", ASCENDING)],
+            name="upload_chunk_unique",
+            unique=True,
+        ),
+        IndexModel(
+            [("expires_at", ASCENDING)], name="expires_at", expireAfterSeconds=0
+        ),
+    ]
+
+    async def put(
+        self, upload_id: ObjectId, index: int, data: bytes, expires_at: datetime
+    ) -> None:
+        """Stores a chunk of an upload, replacing a previously received copy
+
+        Args:
+            upload_id (ObjectId): id of the upload
+            index (int): position of the chunk
+            data (bytes): content of the chunk
+            expires_at (datetime): expiry of the upload
+        """
+        await self.collection.update_one(
+            {"upload_id": upload_id, "index": index},
+            {"$set": {"data": Binary(data), "expires_at": expires_at}},
+            upsert=True,
+        )
+
+    async def iterate_data(self, upload_id: ObjectId) -> AsyncIterator[bytes]:
+        """Yields the content of every chunk of an upload in order, one at a time"""
+        chunks = self.collection.find(
+            {"upload_id": upload_id},
+            projection={"_id": 0, "data": 1},
+            sort=[("index", ASCENDING)],
+        ).batch_size(1)
+        try:
+            async for chunk in chunks:
+                yield bytes(chunk["data"])
+        finally:
+            await chunks.close()
+
+    async def set_expiry(
+        self, upload_id: ObjectId, expires_at: Optional[datetime]
+    ) -> None:
+        """Moves the expiry of every chunk of an upload, None keeps them"""
+        await self.collection.update_many(
+            {"upload_id": upload_id}, {"$set": {"expires_at": expires_at}}
+        )
+
+    async def delete_upload(self, upload_id: ObjectId) -> None:
+        await self.collection.delete_many({"upload_id": upload_id})
@@ -0,0 +1,86 @@
+import math
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+from pydantic import BaseModel, Field, validator
+
+from src.apps.rooms.schema import SessionMessageSchema
+from src.libs import DefaultResponse, PyObjectId
+from . import constants, models
+from .enums import UploadStatus
+
+
+class MediaUploadResponseSchema(DefaultResponse):
+    data: models.MediaModel
+
+    class Config:
+        json_encoders = {ObjectId: str, datetime: lambda v: v.isoformat()}
+
+
+class MessageSender(BaseModel):
+    """Device or session user sending messages, and the session room they are in"""
+
+    id: str
+    username: Optional[str] = None
+    session_room_id: Optional[str] = None
+
+
+class TextMessageCreateSchema(SessionMessageSchema):
+    room_id: Optional[str] = None  # not needed inside a session
+
+
+class UploadCreateSchema(BaseModel):
+    room_id: Optional[str] = None  # not needed inside a session
+    file_name: str
+    content_type: Optional[str] = None
+    total_size: int = Field(gt=0, le=constants.UPLOAD_MAX_SIZE)
+    chunk_size: int = Field(
+        default=constants.UPLOAD_DEFAULT_CHUNK_SIZE,
+        gt=0,
+        le=constants.UPLOAD_MAX_CHUNK_SIZE,
+    )
+
+    @validator("chunk_size")
+    def validate_chunk_size(cls, value: int, values: dict):
+        total_size = values.get("total_size")
+        if total_size is None:
+            return value
+        if value < min(constants.UPLOAD_MIN_CHUNK_SIZE, total_size):
+            raise ValueError(
+                f"chunk_size must be at least {constants.UPLOAD_MIN_CHUNK_SIZE} bytes"
+            )
+        if math.ceil(total_size / value) > constants.UPLOAD_MAX_CHUNKS:
+            raise ValueError(
+                f"total_size needs more than {constants.UPLOAD_MAX_CHUNKS} chunks"
+            )
+        return value
+
+
+class UploadStatusSchema(BaseModel):
+    id: PyObjectId = Field(alias="_id")
+    channel: str
+    file_name: str
+    content_type: Optional[str]
+    total_size: int
+    chunk_size: int
+    total_chunks: int
+    received_chunks: list[int]
+    missing_ranges: list[tuple[int, int]]  # first and last index of missing chunks
+    offset: int  # bytes received without a gap from the start
+    status: UploadStatus
+    media_id: Optional[PyObjectId]
+    sha256: Optional[str]
+    expires_at: Optional[datetime]
+
+    class Config:
+        allow_population_by_field_name = True
+        arbitrary_types_allowed = True
+        json_encoders = {ObjectId: str, datetime: lambda v: v.isoformat()}
+
+
+class UploadResponseSchema(DefaultResponse):
+    data: UploadStatusSchema
+
+    class Config:
+        json_encoders = {ObjectId: str, datetime: lambda v: v.isoformat()}
@@ -0,0 +1,324 @@
+import math
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Optional
+
+import pytz
+from bson import ObjectId
+
+from src.libs import BaseService, WebsocketEvents, event_outbox, exceptions
+from src.libs.file_storage import FileSystem
+from . import constants, models, repository, schema, utils
+from .enums import UploadStatus
+
+
+class MediaService(BaseService):
+    repository_klass = repository.MediaRepository
+    data_create_klass = models.MediaModel
+    data_transfer_klass = models.MediaModel
+    data_response_klass = models.MediaModel
+    model_klass = models.MediaModel
+    unique_fields = []
+
+    async def store(
+        self,
+        file_name: str,
+        chunks: AsyncIterator[bytes],
+        sender_id: str,
+        content_type: Optional[str] = None,
+        channel: Optional[str] = None,
+        max_size: Optional[int] = None,
+    ) -> models.MediaModel:
+        """Stores the content in the file system, shared with identical content,
+        and records it under the name and media type of this sender
+
+        Args:
+            file_name (str): name of the media
+            chunks (AsyncIterator[bytes]): content of the media
+            sender_id (str): device or session user sending the media
+            content_type (Optional[str]): media type of the content
+            channel (Optional[str]): room or session the media is published to
+            max_size (Optional[int]): largest content in bytes
+
+        Raises:
+            BadRequest: when the content is larger than max_size
+        """
+        file_system = FileSystem(self.database)
+        stored_file = await file_system.upload_stream(
+            file_name, chunks, max_size=max_size
+        )
+        media = self.model_klass(
+            file_id=stored_file.id,
+            file_name=file_name,
+            content_type=content_type,
+            length=stored_file.length,
+            sha256=stored_file.sha256,
+            sender_id=sender_id,
+            channel=channel,
+        )
+        try:
+            return await self.repository.create(media)
+        except Exception:
+            await file_system.delete(stored_file.id)
+            raise
+
+    async def get_media(
+        self, id_: ObjectId, sender: schema.MessageSender
+    ) -> models.MediaModel:
+        """Gets media the sender can read: media it sent, or media published to a
+        room or session it is a member of
+
+        Raises:
+            NotFoundException: when no media has the id or the sender cannot read it,
+                so media of other rooms is not disclosed
+        """
+        media = await self.repository.get(id_)
+        if media is not None and media.sender_id != sender.id:
+            try:
+                if not media.channel:
+                    raise exceptions.ForbiddenException("Media is not published")
+                await utils.resolve_channel(self.database, sender, media.channel)
+            except (exceptions.BadRequest, exceptions.ForbiddenException):
+                media = None
+        if media is None:
+            raise exceptions.NotFoundException(f"Media with id {id_} does not exist")
+        return media
+
+    async def release(self, media: models.MediaModel) -> None:
+        """Deletes a media record and its reference to the stored content"""
+        if await self.repository.delete(media.id):
+            await FileSystem(self.database).delete(media.file_id)
+
+
+class UploadService(BaseService):
+    repository_klass = repository.UploadRepository
+    data_create_klass = schema.UploadCreateSchema
+    data_transfer_klass = schema.UploadCreateSchema
+    data_response_klass = models.UploadModel
+    model_klass = models.UploadModel
+    unique_fields = []
+
+    def __init__(self, database):
+        super().__init__(database)
+        self.chunk_repository = repository.UploadChunkRepository(database)
+
+    @staticmethod
+    def to_status(upload: models.UploadModel) -> schema.UploadStatusSchema:
+        """Describes what is left to upload, so a client can resume.
+        Missing chunks are reported as ranges, so the status stays small"""
+        missing_ranges, first_missing = [], 0
+        for index in sorted(set(upload.received_chunks)):
+            if index > first_missing:
+                missing_ranges.append((first_missing, index - 1))
+            first_missing = index + 1
+        if first_missing < upload.total_chunks:
+            missing_ranges.append((first_missing, upload.total_chunks - 1))
+        contiguous = missing_ranges[0][0] if missing_ranges else upload.total_chunks
+        return schema.UploadStatusSchema(
+            **upload.dict(),
+            missing_ranges=missing_ranges,
+            offset=min(contiguous * upload.chunk_size, upload.total_size),
+        )
+
+    async def create(
+        self,
+        request_instance: schema.UploadCreateSchema,
+        sender: schema.MessageSender,
+        channel: str,
+    ) -> models.UploadModel:
+        """Starts a resumable upload
+
+        Args:
+            request_instance (UploadCreateSchema): details of the media
+            sender (MessageSender): device or session user uploading
+            channel (str): room or session the media is published to
+
+        Returns:
+            UploadModel: created upload
+        """
+        db_model_instance = self.model_klass(
+            **request_instance.dict(exclude={"room_id"}),
+            channel=channel,
+            sender_id=sender.id,
+            total_chunks=math.ceil(
+                request_instance.total_size / request_instance.chunk_size
+            ),
+            expires_at=datetime.now(tz=pytz.utc)
+            + timedelta(seconds=constants.UPLOAD_TTL),
+        )
+        return await self.repository.create(db_model_instance)
+
+    async def get_upload(
+        self, id_: ObjectId, sender: schema.MessageSender
+    ) -> models.UploadModel:
+        """Gets an upload started by the sender
+
+        Raises:
+            NotFoundException: when the sender has no upload with the id
+        """
+        upload = await self.repository.search(_id=id_, sender_id=sender.id)
+        if upload is None:
+            raise exceptions.NotFoundException(f"Upload with id {id_} does not exist")
+        return upload
+
+    async def put_chunk(
+        self, id_: ObjectId, sender: schema.MessageSender, index: int, data: bytes
+    ) -> models.UploadModel:
+        """Stores a numbered chunk. Chunks can be sent in any order and in parallel,
+        and sending a chunk again replaces it
+
+        Args:
+            id_ (ObjectId): id of the upload
+            sender (MessageSender): device or session user uploading
+            index (int): position of the chunk, from 0
+            data (bytes): content of the chunk
+
+        Raises:
+            BadRequest: when the upload is finalized, or the chunk index or size is wrong
+            NotFoundException: when the sender has no upload with the id
+        """
+        upload = await self.get_upload(id_, sender)
+        if upload.status != UploadStatus.PENDING:
+            raise exceptions.BadRequest("Upload is already finalized")
+        if not 0 <= index < upload.total_chunks:
+            raise exceptions.BadRequest(
+                f"Chunk index must be below {upload.total_chunks}"
+            )
+        expected_size = min(
+            upload.chunk_size, upload.total_size - index * upload.chunk_size
+        )
+        if len(data) != expected_size:
+            raise exceptions.BadRequest(f"Chunk {index} must be {expected_size} bytes")
+        await self.chunk_repository.put(id_, index, data, upload.expires_at)
+        updated_upload = await self.repository.add_to_set(
+            {"_id": id_, "status": UploadStatus.PENDING}, "received_chunks", [index]
+        )
+        if updated_upload is None:
+            raise exceptions.BadRequest("Upload is already finalized")
+        return updated_upload
+
+    async def finalize(
+        self, id_: ObjectId, sender: schema.MessageSender
+    ) -> models.UploadModel:
+        """Stores the received chunks as one media file and publishes the media message.
+        Calling it again publishes a stored upload whose message could not be
+        published, or takes over a finalize that stopped halfway
+
+        Args:
+            id_ (ObjectId): id of the upload
+            sender (MessageSender): device or session user uploading
+
+        Raises:
+            BadRequest: when chunks are missing or the upload is already finalized
+            InternalServerException: when the media message could not be published
+            NotFoundException: when the sender has no upload with the id, or it
+                expired before it was claimed
+        """
+        upload = await self.get_upload(id_, sender)
+        if upload.status == UploadStatus.STORED:
+            await self.chunk_repository.delete_upload(id_)
+            return await self._publish(upload)
+        now = datetime.now(tz=pytz.utc)
+        stale_before = now - timedelta(seconds=constants.UPLOAD_FINALIZE_TIMEOUT)
+        # claims the upload, so concurrent finalize calls store it once, and
+        # clears its expiry so it cannot expire while it is stored
+        claimed = await self.repository.update(
+            id_,
+            {"status": UploadStatus.FINALIZING, "expires_at": None},
+            filter_={
+                "received_chunks": {"$size": upload.total_chunks},
+                "$or": [
+                    {"status": UploadStatus.PENDING, "expires_at": {"$gt": now}},
+                    {
+                        "status": UploadStatus.FINALIZING,
+                        "updated_at": {"$lt": stale_before},
+                    },
+                ],
+            },
+        )
+        if claimed is None:
+            if upload.status == UploadStatus.FINALIZING:
+                raise exceptions.BadRequest("Upload is being finalized")
+            if upload.status != UploadStatus.PENDING:
+                raise exceptions.BadRequest("Upload is already finalized")
+            # stored dates are read back in utc without a timezone
+            if upload.expires_at and upload.expires_at.replace(tzinfo=pytz.utc) <= now:
+                raise exceptions.NotFoundException(
+                    f"Upload with id {id_} does not exist"
+                )
+            raise exceptions.BadRequest("Upload has missing chunks")
+        await self.chunk_repository.set_expiry(id_, None)
+        media_service = MediaService(self.database)
+        try:
+            media = await media_service.store(
+                upload.file_name,
+                self.chunk_repository.iterate_data(id_),
+                upload.sender_id,
+                content_type=upload.content_type,
+                channel=upload.channel,
+            )
+            if media.length != upload.total_size:
+                await media_service.release(media)
+                raise exceptions.BadRequest("Upload has missing chunks")
+        except Exception:
+            expires_at = now + timedelta(seconds=constants.UPLOAD_TTL)
+            await self.repository.update(
+                id_, {"status": UploadStatus.PENDING, "expires_at": expires_at}
+            )
+            await self.chunk_repository.set_expiry(id_, expires_at)
+            raise
+        stored = await self.repository.update(
+            id_,
+            {
+                "status": UploadStatus.STORED,
+                "media_id": media.id,
+                "sha256": media.sha256,
+            },
+            filter_={"status": UploadStatus.FINALIZING},
+        )
+        if stored is None:
+            # the upload was removed, or stored by a finalize that took it over
+            await media_service.release(media)
+            await self.get_upload(id_, sender)
+            raise exceptions.BadRequest("Upload is already finalized")
+        await self.chunk_repository.delete_upload(id_)
+        return await self._publish(stored)
+
+    async def _publish(self, upload: models.UploadModel) -> models.UploadModel:
+        """Completes a stored upload and publishes its media message
+
+        Raises:
+            BadRequest: when the upload is already completed
+            InternalServerException: when the outbox is full, the upload then stays
+                stored so finalize can publish it again
+        """
+        # completed uploads expire again, their media is kept
+        completed = await self.repository.update(
+            upload.id,
+            {
+                "status": UploadStatus.COMPLETED,
+                "expires_at": datetime.now(tz=pytz.utc)
+                + timedelta(seconds=constants.UPLOAD_TTL),
+            },
+            filter_={"status": UploadStatus.STORED},
+        )
+        if completed is None:
+            raise exceptions.BadRequest("Upload is already finalized")
+        if not await event_outbox.enqueue(
+            channel=upload.channel,
+            event=WebsocketEvents.MEDIA_MESSAGE_PUBLISHED,
+            data={
+                "media_id": str(upload.media_id),
+                "file_name": upload.file_name,
+                "content_type": upload.content_type,
+                "length": upload.total_size,
+                "sha256": upload.sha256,
+                "sender_id": upload.sender_id,
+            },
+        ):
+            await self.repository.update(
+                upload.id, {"status": UploadStatus.STORED, "expires_at": None}
+            )
+            raise exceptions.InternalServerException(
+                "Media message could not be published, finalize the upload again"
+            )
+        return completed
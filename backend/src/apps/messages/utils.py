@@ -0,0 +1,82 @@
+from typing import Optional
+
+from bson import ObjectId
+from fastapi import Depends
+from fastapi.requests import Request
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from src.apps.rooms import constants as room_constants
+from src.apps.rooms import repository as room_repository
+from src.apps.rooms import utils as session_utils
+from src.config.dependencies import AuthDependency, get_database
+from src.libs import exceptions
+
+from . import schema
+
+optional_bearer = HTTPBearer(auto_error=False)
+
+
+async def get_message_sender(
+    request: Request,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer),
+    database=Depends(get_database),
+) -> schema.MessageSender:
+    """Resolves the sender from a device token, or else from the session cookies"""
+    if credentials:
+        principal = await AuthDependency()(credentials, database)
+        return schema.MessageSender(
+            id=str(principal.device_id), username=principal.email
+        )
+    session_data = await session_utils.get_client_session(
+        request.cookies.get(room_constants.ROOM_SESSION_KEY)
+    )
+    user_data = session_utils.get_user_session(
+        request.cookies.get(room_constants.USER_SESSION_KEY)
+    )
+    if (
+        not session_data
+        or not user_data.get("user_id")
+        or not user_data.get("username")
+    ):
+        raise exceptions.UnauthorizedException("Not authenticated")
+    return schema.MessageSender(
+        id=user_data["user_id"],
+        username=user_data["username"],
+        session_room_id=session_data.get("room_id"),
+    )
+
+
+async def resolve_channel(
+    database, sender: schema.MessageSender, room_id: Optional[str]
+) -> str:
+    """Returns the channel messages of the sender are published to
+
+    Raises:
+        BadRequest: when a device does not name a valid room
+        ForbiddenException: when the sender is not a member of the room
+    """
+    if sender.session_room_id:
+        if room_id and room_id != sender.session_room_id:
+            raise exceptions.ForbiddenException("Sender is not a member of the room")
+        return sender.session_room_id
+    if not room_id or not ObjectId.is_valid(room_id):
+        raise exceptions.BadRequest("A valid room_id is required")
+    if not await room_repository.RoomRepository(database).is_member(
+        ObjectId(room_id), ObjectId(sender.id)
+    ):
+        raise exceptions.ForbiddenException("Sender is not a member of the room")
+    return room_id
+
+
+async def read_body(request: Request, max_size: int) -> bytes:
+    """Reads the request body, rejecting it as soon as it exceeds max_size
+
+    Raises:
+        BadRequest: when the body is larger than max_size
+    """
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > max_size:
+            raise exceptions.BadRequest("Request body is too large")
+    return bytes(body)
@@ -1,37 +1,75 @@
 from typing import Optional, TYPE_CHECKING, Annotated
 from fastapi import status, Query, Depends
 from fastapi.routing import APIRouter
-from fastapi.responses import StreamingResponse
+from fastapi.requests import Request
+from fastapi.responses import Response
 
 from src.apps.auth.schema import UserTokenSchema
-from src.libs import PyObjectId, ResponseStatus, exceptions
-from src.config.dependencies import get_database, AuthDependency
+from src.libs import (
+    MAX_PAGE_SIZE,
+    DefaultResponse,
+    ExportFormat,
+    PyObjectId,
+    ResponseStatus,
+    exceptions,
+    stream_response,
+)
+from src.config.dependencies import get_database, AuthDependency, ProjectionQuery
 from .. import schema, service, models
-from ..libs import QRCodeGenerator
+from ..libs import QRCodeQuery, qr_code_response
 
 router = APIRouter(prefix="/rooms")
 
 
 @router.get(
     path="",
-    response_model=schema.PaginatedRoomSchema,
     status_code=status.HTTP_200_OK,
+    responses={status.HTTP_200_OK: {"model": schema.PaginatedRoomSchema}},
     dependencies=[Depends(AuthDependency())],
 )
 async def list_rooms(
-    size: int = Query(default=10),
-    page: int = Query(default=1),
+    size: int = Query(default=10, ge=1, le=MAX_PAGE_SIZE),
+    page: int = Query(default=1, ge=1),
+    cursor: Optional[str] = Query(default=None),
+    with_count: bool = Query(default=True),
+    projection: ProjectionQuery = Depends(),
     db_session=Depends(get_database),
 ):
-    count, rooms = await service.RoomService(db_session).list(size, page)
-    return schema.PaginatedRoomSchema(
+    count, rooms, next_cursor = await service.RoomService(db_session).list(
+        size,
+        page,
+        cursor=cursor,
+        with_count=with_count,
+        fields=projection.fields,
+        exclude=projection.exclude,
+        raw=True,
+    )
+    response = schema.PaginatedRoomSchema(
         status=ResponseStatus.SUCCESS,
         message="List of rooms",
-        data=rooms,
+        data=[],
         total_count=count,
-        page=page,
+        page=None if cursor else page,
         size=size,
+        next_cursor=next_cursor,
     )
+    return response.document_response(rooms)
+
+
+@router.get(
+    path="/export",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(AuthDependency())],
+)
+async def export_rooms(
+    export_format: ExportFormat = Query(default=ExportFormat.NDJSON, alias="format"),
+    projection: ProjectionQuery = Depends(),
+    db_session=Depends(get_database),
+):
+    rooms = service.RoomService(db_session).stream(
+        fields=projection.fields, exclude=projection.exclude
+    )
+    return stream_response(rooms, export_format, exclude_unset=projection.requested)
 
 
 @router.post(
@@ -54,20 +92,23 @@ async def create_room(
 
 @router.get(
     path="/{id_}",
-    response_model=schema.RoomResponseSchema,
     status_code=status.HTTP_200_OK,
+    responses={status.HTTP_200_OK: {"model": schema.RoomResponseSchema}},
     dependencies=[Depends(AuthDependency())],
 )
 async def get_room(
     id_: PyObjectId,
+    projection: ProjectionQuery = Depends(),
     db_session=Depends(get_database),
 ):
-    room = await service.RoomService(db_session).get(id_)
-    return schema.RoomResponseSchema(
+    room = await service.RoomService(db_session).get(
+        id_, fields=projection.fields, exclude=projection.exclude, raw=True
+    )
+    response = DefaultResponse(
         status=ResponseStatus.SUCCESS,
         message="Room Succesfully Retrieved",
-        data=room,
     )
+    return response.document_response(room)
 
 
 @router.patch(
@@ -109,10 +150,12 @@ async def delete_room(
 @router.get(
     path="/{id_}/qrcode",
     status_code=status.HTTP_200_OK,
-    response_class=StreamingResponse,
+    response_class=Response,
 )
 async def get_room_qrcode(
     id_: PyObjectId,
+    request: Request,
+    qr_code: QRCodeQuery = Depends(),
     db_session=Depends(get_database),
     auth: UserTokenSchema = Depends(AuthDependency()),
 ):
@@ -120,8 +163,7 @@ async def get_room_qrcode(
     room: models.RoomModel = await room_service.get(id_)
     if room.created_by != auth.device_id:
         raise exceptions.ForbiddenException("Cannot create room qrcode")
-    qr_bytes = QRCodeGenerator(encode_data=room.invitation_code).make()
-    return StreamingResponse(qr_bytes, media_type="image/png")
+    return await qr_code_response(request, qr_code.generator(room.invitation_code))
 
 
 @router.post(
@@ -8,20 +8,28 @@ from datetime import datetime, timezone
 from typing import Optional
 
 from bson import ObjectId
-from fastapi import File, Form, Header, UploadFile, status
+from fastapi import Depends, Header, status
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.routing import APIRouter
 
 from src.apps.rooms import constants, schema
 from src.apps.rooms import utils as session_utils
-from src.apps.rooms.libs import QRCodeGenerator
-from src.config.dependencies import Cache
-from src.libs import WebsocketEvents, exceptions, utils
+from src.apps.rooms.libs import QRCodeQuery, qr_code_response
+from src.apps.messages import utils as message_utils
+from src.apps.messages.schema import MessageSender
+from src.config.dependencies import Cache, get_database
+from src.libs import (
+    DefaultResponse,
+    ResponseStatus,
+    WebsocketEvents,
+    exceptions,
+    utils,
+)
 
 router = APIRouter(prefix="/sessions")
-ROOM_SESSION_KEY = "room_session"
-USER_SESSION_KEY = "user_session"
+ROOM_SESSION_KEY = constants.ROOM_SESSION_KEY
+USER_SESSION_KEY = constants.USER_SESSION_KEY
 
 
 @router.post(path="", response_class=JSONResponse)
@@ -42,7 +50,7 @@ async def create_session(
         room_id=room_id, invite_code=invite_code, user_id=user_id, username=username
     ).dict()
     user_data = schema.SessionUserSchema(username=username, user_id=user_id).dict()
-    tasks = session_utils.generate_background_tasks(
+    await session_utils.dispatch_events(
         session_data.get("room_id"),
         [
             {
@@ -52,9 +60,7 @@ async def create_session(
         ],
     )
     expires_dt = datetime.now() + Cache.EXPIRY_DURATION
-    response = JSONResponse(
-        content={"status": "SUCCESS", "data": session_data}, background=tasks
-    )
+    response = JSONResponse(content={"status": "SUCCESS", "data": session_data})
     response.set_cookie(
         key=ROOM_SESSION_KEY,
         value=json.dumps(session_data),
@@ -62,7 +68,7 @@ async def create_session(
     )
     response.set_cookie(
         key=USER_SESSION_KEY,
-        value=user_data,
+        value=json.dumps(user_data),
         expires=expires_dt.astimezone(timezone.utc),
     )
     await Cache.set(session_data, session_data.get("invite_code"))
@@ -76,15 +82,15 @@ async def join_session(
     user_agent: Optional[str] = Header(default=None),
 ):
     room_session: Optional[str] = request.cookies.get(ROOM_SESSION_KEY)
-    session_data = await session_utils.get_client_session(room_session)
-    if session_data:
+    if await session_utils.get_client_session(room_session):
         raise exceptions.ForbiddenException("User is present in a session")
+    session_data = await Cache.get(invitation_data.invitation_code, refresh=True)
+    if not session_data:
+        raise exceptions.BadRequest("Invalid invitation code")
     user_data = schema.SessionUserSchema(
         username=session_utils.generate_username(user_agent), user_id=str(ObjectId())
     ).dict()
-    if session_data.get("invite_code") != invitation_data.invitation_code:
-        raise exceptions.BadRequest("Invalid invitation code")
-    tasks = session_utils.generate_background_tasks(
+    await session_utils.dispatch_events(
         room_id=session_data.get("room_id"),
         events=[
             {
@@ -95,9 +101,7 @@ async def join_session(
             }
         ],
     )
-    response = JSONResponse(
-        content={"status": "SUCCESS", "data": session_data}, background=tasks
-    )
+    response = JSONResponse(content={"status": "SUCCESS", "data": session_data})
     response.set_cookie(
         key=ROOM_SESSION_KEY,
         value=json.dumps(session_data),
@@ -105,10 +109,9 @@ async def join_session(
     )
     response.set_cookie(
         key=USER_SESSION_KEY,
-        value=user_data,
+        value=json.dumps(user_data),
         expires=datetime.utcnow() + Cache.EXPIRY_DURATION,
     )
-    await Cache.set(session_data, session_data.get("invite_code"))
     return response
 
 
@@ -116,50 +119,59 @@ async def join_session(
 async def leave_session(request: Request):
     room_session: Optional[str] = request.cookies.get(ROOM_SESSION_KEY)
     session_data = await session_utils.get_client_session(room_session)
-    user_data = request.cookies.get(USER_SESSION_KEY)
+    user_data = session_utils.get_user_session(request.cookies.get(USER_SESSION_KEY))
     if not session_data:
         raise exceptions.BadRequest("User is not in a session")
     await Cache.remove(session_data.get("invite_code"))
-    tasks = session_utils.generate_background_tasks(
+    await session_utils.dispatch_events(
         room_id=session_data.get("room_id"),
         events=[
             {
-                "event": WebsocketEvents.ROOM_LEFT,
+                "event": WebsocketEvents.ROOM_LEAVE,
                 "data": schema.SessionJoinLeaveSchema(
                     room_id=session_data.get("room_id"), **user_data
                 ).dict(),
             }
         ],
     )
-    response = JSONResponse(status_code=status.HTTP_204_NO_CONTENT, background=tasks)
+    response = JSONResponse(status_code=status.HTTP_204_NO_CONTENT)
     response.delete_cookie(ROOM_SESSION_KEY)
     response.delete_cookie(USER_SESSION_KEY)
     return response
 
 
-@router.get(path="/qrcode", response_class=JSONResponse)
-async def get_session_qrcode(request: Request):
+@router.get(path="/qrcode", response_class=Response)
+async def get_session_qrcode(request: Request, qr_code: QRCodeQuery = Depends()):
     room_session: Optional[str] = request.cookies.get(ROOM_SESSION_KEY)
     session_data = await session_utils.get_client_session(room_session)
     if not session_data:
         raise exceptions.BadRequest("User is not in a session")
-    user_data = request.cookies.get(USER_SESSION_KEY)
+    user_data = session_utils.get_user_session(request.cookies.get(USER_SESSION_KEY))
     if session_data.get("user_id") != user_data.get("user_id"):
         raise exceptions.ForbiddenException("Inadequate permission to get QR code")
-    qr_bytes = QRCodeGenerator(encode_data=session_data.get("invite_code")).make()
-    return StreamingResponse(qr_bytes, media_type="image/png")
+    return await qr_code_response(
+        request, qr_code.generator(session_data.get("invite_code"))
+    )
 
 
-@router.get(path="/message", response_class=JSONResponse)
+@router.post(
+    path="/message",
+    status_code=status.HTTP_202_ACCEPTED,
+    responses={status.HTTP_202_ACCEPTED: {"model": DefaultResponse}},
+)
 async def send_message(
-    request: Request,
-    text: Optional[str] = Form(default=None, description="Text Message"),
-    media: Optional[UploadFile] = File(default=None, description="Media Message"),
+    message_data: schema.SessionMessageSchema,
+    sender: MessageSender = Depends(message_utils.get_message_sender),
+    database=Depends(get_database),
 ):
-    room_session: Optional[str] = request.cookies.get(ROOM_SESSION_KEY)
-    session_data = await session_utils.get_client_session(room_session)
-    if not session_data:
+    """
+    Publishes a text message to the session of the user
+    """
+    if not sender.session_room_id:
         raise exceptions.BadRequest("User is not in a session")
-    if len(list(filter(lambda bool: (text, media)))) != 1:
-        raise exceptions.BadRequest("Only one of text or media is required")
-    return JSONResponse(content={"status": "SUCCESS", "message": "Message sent"})
+    channel = await message_utils.resolve_channel(database, sender, None)
+    data = await session_utils.publish_text_message(
+        channel, sender.id, sender.username, message_data.message
+    )
+    response = DefaultResponse(status=ResponseStatus.SUCCESS, message="Message sent")
+    return response.document_response(data, status_code=status.HTTP_202_ACCEPTED)
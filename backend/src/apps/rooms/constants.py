@@ -1,2 +1,13 @@
 ROOM_DB_COLLECTION_NAME = "ROOMS"
 ROOM_INVITE_PREFIX = "IVT"
+QR_CACHE_SIZE = 1024  # rendered qr codes kept in process
+QR_CACHE_TTL = 3600  # seconds
+QR_CACHE_MAX_AGE = 300  # seconds clients may reuse a qr code before revalidating
+QR_RENDER_CONCURRENCY = 4  # qr codes rendered at once off the event loop
+QR_MAX_BOX_SIZE = 40  # pixels per module
+QR_MAX_BORDER = 16  # modules
+ROOM_SESSION_KEY = "room_session"  # cookie holding the session a client is in
+USER_SESSION_KEY = "user_session"  # cookie holding the session user of a client
+ROOM_MEMBER_CACHE_SIZE = 10000  # room memberships of devices kept in process
+ROOM_MEMBER_CACHE_TTL = 30  # seconds other workers may still see a removed device
+TEXT_MESSAGE_MAX_LENGTH = 16384  # characters, under the centrifugo message limit
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class QRCodeFormat(str, Enum):
+    PNG = "PNG"
+    SVG = "SVG"
+    ASCII = "ASCII"
@@ -1 +1,2 @@
-from .qr_code_generator import QRCodeGenerator
+from .qr_code_generator import QRCodeGenerator, QRCodeQuery
+from .qr_cache import qr_code_cache, qr_code_response
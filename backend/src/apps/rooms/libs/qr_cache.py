@@ -0,0 +1,116 @@
+from typing import Optional
+
+import anyio
+from decouple import config
+from fastapi.requests import Request
+from fastapi.responses import Response
+
+from src.config.dependencies import Cache
+from src.libs import TTLCache, metrics_registry
+from src.libs.streaming import etag_matches
+
+from .. import constants
+from .qr_code_generator import QRCodeGenerator
+
+
+class QRCodeCache:
+    """
+    Rendered qr codes keyed by a digest of their inputs.
+    Lookups go through an in-process LRU, then redis when it is enabled,
+    and only render the image when both miss. Redis entries expire after
+    their TTL so unused codes are evicted.
+    Rendering runs in worker threads, at most render_concurrency at once,
+    so it never blocks the event loop.
+    """
+
+    REDIS_ENABLED = config("QR_CACHE_REDIS", default=False, cast=bool)
+    REDIS_TTL = config("QR_CACHE_REDIS_TTL", default=86400, cast=int)
+    REDIS_PREFIX = "qrcode:"
+
+    def __init__(self, maxsize: int, ttl: float, render_concurrency: int) -> None:
+        self.local = TTLCache(maxsize, ttl)
+        self.render_concurrency = render_concurrency
+        self._limiter: Optional[anyio.CapacityLimiter] = None
+        self.renders = 0
+        self.redis_hits = 0
+
+    def stats(self) -> dict:
+        return {
+            **self.local.stats(),
+            "renders": self.renders,
+            "redis_hits": self.redis_hits,
+            "renders_in_flight": self._limiter.borrowed_tokens if self._limiter else 0,
+        }
+
+    def _get_limiter(self) -> anyio.CapacityLimiter:
+        # the limiter binds to the running event loop, so it is created on first use
+        if self._limiter is None:
+            self._limiter = anyio.CapacityLimiter(self.render_concurrency)
+        return self._limiter
+
+    async def get(self, generator: QRCodeGenerator) -> bytes:
+        """Returns the rendered image of the generator, rendering it on a miss
+
+        Args:
+            generator (QRCodeGenerator): generator of the qr code
+
+        Returns:
+            bytes: encoded image
+        """
+        key = generator.cache_key
+        image = self.local.get(key)
+        if image is not None:
+            return image
+        image = await self._get_redis(key)
+        if image is not None:
+            self.redis_hits += 1
+        else:
+            image = await anyio.to_thread.run_sync(
+                lambda: generator.make().getvalue(), limiter=self._get_limiter()
+            )
+            self.renders += 1
+            await self._set_redis(key, image)
+        self.local.set(key, image)
+        return image
+
+    async def _get_redis(self, key: str) -> Optional[bytes]:
+        if not self.REDIS_ENABLED:
+            return None
+        try:
+            return await Cache.get_client().get(self.REDIS_PREFIX + key)
+        except Exception:
+            return None
+
+    async def _set_redis(self, key: str, image: bytes) -> None:
+        if not self.REDIS_ENABLED:
+            return
+        try:
+            await Cache.get_client().set(
+                self.REDIS_PREFIX + key, image, ex=self.REDIS_TTL
+            )
+        except Exception:
+            pass
+
+
+qr_code_cache = QRCodeCache(
+    constants.QR_CACHE_SIZE, constants.QR_CACHE_TTL, constants.QR_RENDER_CONCURRENCY
+)
+metrics_registry.register("qrcode_cache", qr_code_cache.stats)
+
+
+async def qr_code_response(request: Request, generator: QRCodeGenerator) -> Response:
+    """Responds with the qr code image, or 304 when the client already holds it
+
+    Args:
+        request (Request): request carrying the If-None-Match header
+        generator (QRCodeGenerator): generator of the qr code
+    """
+    etag = f'"{generator.cache_key}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={constants.QR_CACHE_MAX_AGE}",
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    image = await qr_code_cache.get(generator)
+    return Response(content=image, media_type=generator.media_type, headers=headers)
@@ -1,16 +1,54 @@
+import hashlib
 import io
+
 import qrcode
+from fastapi import Query
+from qrcode.image.svg import SvgPathImage
+
+from .. import constants
+from ..enums import QRCodeFormat
 
 
 class QRCodeGenerator:
-    def __init__(self, encode_data: str):
+    MEDIA_TYPES = {
+        QRCodeFormat.PNG: "image/png",
+        QRCodeFormat.SVG: "image/svg+xml",
+        QRCodeFormat.ASCII: "text/plain; charset=utf-8",
+    }
+
+    def __init__(
+        self,
+        encode_data: str,
+        box_size: int = 10,
+        border_size: int = 4,
+        error_correction: int = qrcode.ERROR_CORRECT_M,
+        output_format: QRCodeFormat = QRCodeFormat.PNG,
+    ):
         self.encode_data = encode_data
-        self._border_size = 4
-        self._box_size = 10
-        self._error_correction = qrcode.ERROR_CORRECT_M
+        self._border_size = border_size
+        self._box_size = box_size
+        self._error_correction = error_correction
         self._fill_color = "black"
         self._back_color = "white"
-        self._output_format = "PNG"
+        self._output_format = output_format
+
+    @property
+    def media_type(self) -> str:
+        return self.MEDIA_TYPES[self._output_format]
+
+    @property
+    def cache_key(self) -> str:
+        """Digest of every input of the rendered image, identical inputs render identical bytes"""
+        parts = (
+            self.encode_data,
+            self._box_size,
+            self._border_size,
+            self._error_correction,
+            self._fill_color,
+            self._back_color,
+            self._output_format.value,
+        )
+        return hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()
 
     def make(self) -> io.BytesIO:
         qr = qrcode.QRCode(
@@ -21,10 +59,39 @@ class QRCodeGenerator:
         )
         qr.add_data(self.encode_data)
         qr.make(fit=True)
-        qr_image = qr.make_image(
-            fill_color=self._fill_color, back_color=self._back_color
-        )
         byte_io = io.BytesIO()
-        qr_image.save(byte_io)
+        if self._output_format == QRCodeFormat.ASCII:
+            text_io = io.StringIO()
+            qr.print_ascii(out=text_io)
+            byte_io.write(text_io.getvalue().encode())
+        elif self._output_format == QRCodeFormat.SVG:
+            qr.make_image(image_factory=SvgPathImage).save(byte_io)
+        else:
+            qr_image = qr.make_image(
+                fill_color=self._fill_color, back_color=self._back_color
+            )
+            qr_image.save(byte_io)
         byte_io.seek(0)
         return byte_io
+
+
+class QRCodeQuery:
+    """Reads the output options of a qr code from the query string"""
+
+    def __init__(
+        self,
+        output_format: QRCodeFormat = Query(default=QRCodeFormat.PNG, alias="format"),
+        box_size: int = Query(default=10, ge=1, le=constants.QR_MAX_BOX_SIZE),
+        border: int = Query(default=4, ge=0, le=constants.QR_MAX_BORDER),
+    ):
+        self.output_format = output_format
+        self.box_size = box_size
+        self.border = border
+
+    def generator(self, encode_data: str) -> QRCodeGenerator:
+        return QRCodeGenerator(
+            encode_data,
+            box_size=self.box_size,
+            border_size=self.border,
+            output_format=self.output_format,
+        )
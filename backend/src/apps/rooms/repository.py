@@ -1,7 +1,47 @@
-from src.libs import BaseRepository
+from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
+
+from src.libs import BaseRepository, TTLCache, metrics_registry
 from . import models, constants
 
 
 class RoomRepository(BaseRepository):
     model_klass = models.RoomModel
     collection_name = constants.ROOM_DB_COLLECTION_NAME
+    # memberships known to exist, tagged by room so removals drop them at once
+    member_cache = TTLCache(
+        maxsize=constants.ROOM_MEMBER_CACHE_SIZE, ttl=constants.ROOM_MEMBER_CACHE_TTL
+    )
+    indexes = [
+        IndexModel(
+            [("invitation_code", ASCENDING)], name="invitation_code_unique", unique=True
+        ),
+        # multikey index over the device ids of every room
+        IndexModel([("devices", ASCENDING)], name="devices"),
+        IndexModel([("created_by", ASCENDING)], name="created_by"),
+    ]
+
+    async def is_member(self, id_: ObjectId, device_id: ObjectId) -> bool:
+        """Checks that a device is in a room, from the member cache when possible
+
+        Args:
+            id_ (ObjectId): id of the room
+            device_id (ObjectId): id of the device
+
+        Returns:
+            bool: True when the device is a member of the room
+        """
+        if self.member_cache.get((id_, device_id)):
+            return True
+        if not await self.exists(_id=id_, devices=device_id):
+            return False
+        self.member_cache.set((id_, device_id), True, tags=[id_])
+        return True
+
+    @classmethod
+    def invalidate_members(cls, id_: ObjectId):
+        """Drops cached memberships of a room after devices leave it"""
+        cls.member_cache.invalidate_tag(id_)
+
+
+metrics_registry.register("room_member_cache", RoomRepository.member_cache.stats)
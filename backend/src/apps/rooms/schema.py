@@ -5,6 +5,7 @@ from bson import ObjectId
 from pydantic import BaseModel, Field
 from src.libs import DefaultResponse, PaginationModel, PyObjectId, WebsocketEvents
 
+from . import constants
 from .models import RoomModel
 
 
@@ -61,6 +62,10 @@ class SessionTextMessageSchema(SessionJoinLeaveSchema):
     message: str
 
 
+class SessionMessageSchema(BaseModel):
+    message: str = Field(min_length=1, max_length=constants.TEXT_MESSAGE_MAX_LENGTH)
+
+
 class EventDataDict(TypedDict):
     event: WebsocketEvents
     data: dict
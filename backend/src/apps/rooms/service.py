@@ -1,5 +1,4 @@
 from bson import ObjectId
-from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
 
 from src.apps import users
@@ -16,12 +15,10 @@ class RoomService(BaseService):
     unique_fields = ["devices"]
 
     async def __validate_devices(self, devices: list[ObjectId]):
-        search_kwargs = {"_id": {"$in": devices}}
-        searched_devices = await users.DeviceRepository(self.database).search(
-            many=True, **search_kwargs
-        )
-        searched_devices_ids = [device["_id"] for device in searched_devices]
-        if not all(device_id in searched_devices_ids for device_id in devices):
+        device_repository = users.DeviceRepository(self.database)
+        if await device_repository.missing_ids(
+            devices, cache=device_repository.id_cache
+        ):
             raise exceptions.BadRequest("Some Device Ids are not valid")
 
     async def create(
@@ -41,15 +38,12 @@ class RoomService(BaseService):
         db_model_instance = self.model_klass(
             **request_instance.dict(), created_by=created_by
         )
-        search_kwargs = {"devices": {"$all": request_instance.devices}}
-        if await self.repository.search(**search_kwargs):
+        if await self.repository.exists(devices={"$all": request_instance.devices}):
             raise exceptions.BadRequest(
                 "Cannot create room, due to existence of room containing exact members"
             )
-        self.__validate_devices(request_instance.devices)
-        created_room = await self.repository.create(db_model_instance)
-        response = self.data_response_klass(**jsonable_encoder(created_room))
-        return response
+        await self.__validate_devices(request_instance.devices)
+        return await self.repository.create(db_model_instance)
 
     async def update(
         self, id_: ObjectId, update_instance: schema.RoomDTOSchema
@@ -66,20 +60,35 @@ class RoomService(BaseService):
         Raises:
             BadRequest: when unique data already exists in database
         """
-        room: models.RoomModel = self.get(id_)
-        search_kwargs = {"devices": {"$all": update_instance.devices}}
-        if await self.repository.search(**search_kwargs):
-            raise exceptions.BadRequest(
-                "Cannot create room, due to existence of room containing exact members"
-            )
-        update_data = jsonable_encoder(
-            update_instance, exclude_none=True, exclude_unset=True
-        )
-        updated_room = room.copy(update_data)
-        self.__validate_devices(updated_room.devices)
-        updated_room = await self.repository.update(id_, updated_room)
-        response = self.data_response_klass(**jsonable_encoder(updated_room))
-        return response
+        update_data = update_instance.dict(exclude_none=True, exclude_unset=True)
+        filter_ = None
+        if "devices" in update_data:
+            if await self.repository.exists(
+                _id={"$ne": id_}, devices={"$all": update_data["devices"]}
+            ):
+                raise exceptions.BadRequest(
+                    "Cannot create room, due to existence of room containing exact members"
+                )
+            await self.__validate_devices(update_data["devices"])
+            # the creator of a room must remain one of its devices
+            filter_ = {"created_by": {"$in": update_data["devices"]}}
+        updated_room = await self.repository.update(id_, update_data, filter_=filter_)
+        if updated_room is None:
+            if filter_ and await self.repository.exists(_id=id_):
+                raise exceptions.BadRequest("Room creator cannot be removed from room")
+            raise exceptions.NotFoundException(f"Object with id {id_} does not exist")
+        if filter_:
+            self.repository.invalidate_members(id_)
+        return updated_room
+
+    async def delete(self, id_: ObjectId):
+        await super().delete(id_)
+        self.repository.invalidate_members(id_)
+
+    async def __raise_update_failure(self, id_: ObjectId, message: str):
+        if not await self.repository.exists(_id=id_):
+            raise exceptions.NotFoundException(f"Object with id {id_} does not exist")
+        raise exceptions.BadRequest(message)
 
     async def add_devices(
         self, id_: ObjectId, devices: list[ObjectId], user_device: ObjectId
@@ -89,31 +98,36 @@ class RoomService(BaseService):
         Args:
             devices [list[ObjectId]]: list of devices to be added
         """
-        self.__validate_devices(devices)
-        room: models.RoomModel = await self.get(id_)
-        if room.created_by != user_device:
-            raise exceptions.BadRequest("Inadequate permission to add device")
-        room.devices.extend(devices)
-        updated_room = await self.repository.update(id_, room)
-        response = self.data_response_klass(**jsonable_encoder(updated_room))
-        return response
+        await self.__validate_devices(devices)
+        room = await self.repository.add_to_set(
+            {"_id": id_, "created_by": user_device}, "devices", devices
+        )
+        if room is None:
+            await self.__raise_update_failure(
+                id_, "Inadequate permission to add device"
+            )
+        return room
 
     async def remove_devices(
         self, id_: ObjectId, devices: list[ObjectId], user_device: ObjectId
     ):
-        """Adds devices to room
+        """Removes devices from room
 
         Args:
-            devices [list[ObjectId]]: list of devices to be added
+            devices [list[ObjectId]]: list of devices to be removed
         """
-        self.__validate_devices(devices)
-        room: models.RoomModel = await self.get(id_)
-        if room.created_by != user_device:
-            raise exceptions.BadRequest("Inadequate permission to remove device")
-        room.devices = [device for device in room.devices if device not in devices]
-        updated_room = await self.repository.update(id_, room)
-        response = self.data_response_klass(**jsonable_encoder(updated_room))
-        return response
+        await self.__validate_devices(devices)
+        if user_device in devices:
+            raise exceptions.BadRequest("Room creator cannot be removed from room")
+        room = await self.repository.pull(
+            {"_id": id_, "created_by": user_device}, "devices", devices
+        )
+        if room is None:
+            await self.__raise_update_failure(
+                id_, "Inadequate permission to remove device"
+            )
+        self.repository.invalidate_members(id_)
+        return room
 
     async def join_room(self, invitation_code: str, device_id: ObjectId):
         """Join a room
@@ -122,14 +136,17 @@ class RoomService(BaseService):
             invitation_code (str): room invitation code
             device (ObjectId): logged in device requesting to join
         """
-        self.__validate_devices(devices=[device_id])
-        room: models.RoomModel = await self.search(invitation_code=invitation_code)
-        if device_id in room.devices:
+        await self.__validate_devices(devices=[device_id])
+        room = await self.repository.push(
+            {"invitation_code": invitation_code, "devices": {"$ne": device_id}},
+            "devices",
+            device_id,
+        )
+        if room is None:
+            if not await self.repository.exists(invitation_code=invitation_code):
+                raise exceptions.NotFoundException("Objects matching filters not found")
             raise exceptions.BadRequest("Device already present in connection")
-        room.devices.append(device_id)
-        updated_room = await self.repository.update(room.id, room)
-        response = self.data_response_klass(**jsonable_encoder(updated_room))
-        return response
+        return room
 
     async def leave_room(self, id_: ObjectId, device_id: ObjectId):
         """leave room
@@ -137,10 +154,14 @@ class RoomService(BaseService):
         Args:
             device (ObjectId): logged in device requesting to leave
         """
-        room: models.RoomModel = await self.get(id_)
-        if device_id not in room.devices:
-            raise exceptions.BadRequest("Device is not present in room")
-        room.devices.remove(device_id)
-        updated_room = await self.repository.update(room.id, room)
-        response = self.data_response_klass(**jsonable_encoder(updated_room))
-        return response
+        room = await self.repository.pull(
+            {"_id": id_, "devices": device_id, "created_by": {"$ne": device_id}},
+            "devices",
+            [device_id],
+        )
+        if room is None:
+            if await self.repository.exists(_id=id_, created_by=device_id):
+                raise exceptions.BadRequest("Room creator cannot leave room")
+            await self.__raise_update_failure(id_, "Device is not present in room")
+        self.repository.invalidate_members(id_)
+        return room
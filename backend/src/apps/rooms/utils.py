@@ -1,34 +1,57 @@
 import json
 
-from fastapi import BackgroundTasks
-
 from src.apps.rooms import schema
 from src.config.dependencies.cache import Cache
-from src.libs import utils
-from src.libs.websockets import WebSocketEmitter
+from src.libs import WebsocketEvents, exceptions, utils
+from src.libs.outbox import event_outbox
 
 
 async def get_client_session(room_session: str = None):
     if room_session:
         room_session_data: dict = json.loads(room_session)
-        session_data = await Cache.get(room_session_data.get("invite_code"))
+        session_data = await Cache.get(
+            room_session_data.get("invite_code"), refresh=True
+        )
         return session_data
 
 
+def get_user_session(user_session: str = None) -> dict:
+    return json.loads(user_session) if user_session else {}
+
+
 def generate_username(user_agent: str):
     parsed_user_agent = utils.parse_user_agent(user_agent)
-    return (
-        f"{parsed_user_agent.get('device_brand') or ''} {parsed_user_agent.get('os')}"
-    )
+    return f"{parsed_user_agent.get('device_brand') or ''} {parsed_user_agent.get('operating_system')}"
 
 
-def generate_background_tasks(room_id: str, events: list[schema.EventDataDict]):
-    tasks = BackgroundTasks()
+async def dispatch_events(room_id: str, events: list[schema.EventDataDict]):
+    """Hands room events to the outbox for delivery after the response"""
     for event_data in events:
-        tasks.add_task(
-            WebSocketEmitter.publish,
+        await event_outbox.enqueue(
             channel=room_id,
             event=event_data.get("event"),
             data=event_data.get("data"),
         )
-    return tasks
+
+
+async def publish_text_message(
+    room_id: str, user_id: str, username: str, message: str
+) -> dict:
+    """Hands a text message to the outbox for delivery after the response.
+    The payload has the fields of SessionTextMessageSchema, built directly since
+    every value is already validated on this hot path
+
+    Raises:
+        InternalServerException: when the outbox is full
+    """
+    data = {
+        "user_id": user_id,
+        "username": username,
+        "room_id": room_id,
+        "message": message,
+    }
+    if not await event_outbox.enqueue(
+        channel=room_id, event=WebsocketEvents.TEXT_MESSAGE_PUBLISHED, data=data
+    ):
+        raise exceptions.InternalServerException("Message could not be published")
+    return data
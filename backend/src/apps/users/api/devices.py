@@ -2,8 +2,15 @@ from typing import Optional
 from fastapi import status, Query, Depends
 from fastapi.routing import APIRouter
 
-from src.libs import PyObjectId, ResponseStatus
-from src.config.dependencies import get_database, AuthDependency
+from src.libs import (
+    MAX_PAGE_SIZE,
+    DefaultResponse,
+    ExportFormat,
+    PyObjectId,
+    ResponseStatus,
+    stream_response,
+)
+from src.config.dependencies import get_database, AuthDependency, ProjectionQuery
 from .. import schema, service
 
 
@@ -12,39 +19,76 @@ router = APIRouter(prefix="/devices")
 
 @router.get(
     path="",
-    response_model=schema.PaginatedDeviceSchema,
     status_code=status.HTTP_200_OK,
+    responses={status.HTTP_200_OK: {"model": schema.PaginatedDeviceSchema}},
     dependencies=[Depends(AuthDependency())],
 )
 async def list_devices(
-    size: int = Query(default=10),
-    page: int = Query(default=1),
+    size: int = Query(default=10, ge=1, le=MAX_PAGE_SIZE),
+    page: int = Query(default=1, ge=1),
+    cursor: Optional[str] = Query(default=None),
+    with_count: bool = Query(default=True),
+    projection: ProjectionQuery = Depends(),
     database_session=Depends(get_database),
-    user_id: Optional[str] = None,
+    user_id: Optional[PyObjectId] = None,
 ):
-    count, devices = await service.DeviceService(database_session).list(
-        size, page, user_id=user_id
+    filter_kwargs = {"user_id": user_id} if user_id else {}
+    count, devices, next_cursor = await service.DeviceService(database_session).list(
+        size,
+        page,
+        cursor=cursor,
+        with_count=with_count,
+        fields=projection.fields,
+        exclude=projection.exclude,
+        raw=True,
+        **filter_kwargs,
     )
-    return schema.PaginatedDeviceSchema(
+    response = schema.PaginatedDeviceSchema(
         status=ResponseStatus.SUCCESS,
         message="List of devices",
-        data=devices,
+        data=[],
         total_count=count,
-        page=page,
+        page=None if cursor else page,
         size=size,
+        next_cursor=next_cursor,
     )
+    return response.document_response(devices)
+
+
+@router.get(
+    path="/export",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(AuthDependency())],
+)
+async def export_devices(
+    export_format: ExportFormat = Query(default=ExportFormat.NDJSON, alias="format"),
+    projection: ProjectionQuery = Depends(),
+    database_session=Depends(get_database),
+    user_id: Optional[PyObjectId] = None,
+):
+    filter_kwargs = {"user_id": user_id} if user_id else {}
+    devices = service.DeviceService(database_session).stream(
+        fields=projection.fields, exclude=projection.exclude, **filter_kwargs
+    )
+    return stream_response(devices, export_format, exclude_unset=projection.requested)
 
 
 @router.get(
     path="/{id_}",
-    response_model=schema.DeviceResponseSchema,
     status_code=status.HTTP_200_OK,
+    responses={status.HTTP_200_OK: {"model": schema.DeviceResponseSchema}},
     dependencies=[Depends(AuthDependency())],
 )
-async def get_device(id_: PyObjectId, database_session=Depends(get_database)):
-    device = await service.DeviceService(database_session).get(id_)
-    return schema.DeviceResponseSchema(
+async def get_device(
+    id_: PyObjectId,
+    projection: ProjectionQuery = Depends(),
+    database_session=Depends(get_database),
+):
+    device = await service.DeviceService(database_session).get(
+        id_, fields=projection.fields, exclude=projection.exclude, raw=True
+    )
+    response = DefaultResponse(
         status=ResponseStatus.SUCCESS,
         message="Device successfully retrieved",
-        data=device,
     )
+    return response.document_response(device)
@@ -2,8 +2,16 @@ from typing import Optional
 from fastapi import status, Query, Depends, Header
 from fastapi.routing import APIRouter
 
-from src.libs import PyObjectId, ResponseStatus, utils
-from src.config.dependencies import get_database, AuthDependency
+from src.libs import (
+    MAX_PAGE_SIZE,
+    DefaultResponse,
+    ExportFormat,
+    PyObjectId,
+    ResponseStatus,
+    stream_response,
+    utils,
+)
+from src.config.dependencies import get_database, AuthDependency, ProjectionQuery
 from .. import schema, service, models
 
 
@@ -12,23 +20,52 @@ router = APIRouter(prefix="/users")
 
 @router.get(
     path="",
-    response_model=schema.PaginatedUserSchema,
     status_code=status.HTTP_200_OK,
+    responses={status.HTTP_200_OK: {"model": schema.PaginatedUserSchema}},
 )
 async def list_users(
-    size: int = Query(default=10),
-    page: int = Query(default=1),
+    size: int = Query(default=10, ge=1, le=MAX_PAGE_SIZE),
+    page: int = Query(default=1, ge=1),
+    cursor: Optional[str] = Query(default=None),
+    with_count: bool = Query(default=True),
+    projection: ProjectionQuery = Depends(),
     database_session=Depends(get_database),
 ):
-    count, users = await service.UserService(database_session).list(size, page)
-    return schema.PaginatedUserSchema(
+    count, users, next_cursor = await service.UserService(database_session).list(
+        size,
+        page,
+        cursor=cursor,
+        with_count=with_count,
+        fields=projection.fields,
+        exclude=projection.exclude,
+        raw=True,
+    )
+    response = schema.PaginatedUserSchema(
         status=ResponseStatus.SUCCESS,
         message="List of Users",
-        data=users,
+        data=[],
         total_count=count,
-        page=page,
+        page=None if cursor else page,
         size=size,
+        next_cursor=next_cursor,
     )
+    return response.document_response(users)
+
+
+@router.get(
+    path="/export",
+    status_code=status.HTTP_200_OK,
+    dependencies=[Depends(AuthDependency())],
+)
+async def export_users(
+    export_format: ExportFormat = Query(default=ExportFormat.NDJSON, alias="format"),
+    projection: ProjectionQuery = Depends(),
+    database_session=Depends(get_database),
+):
+    users = service.UserService(database_session).stream(
+        fields=projection.fields, exclude=projection.exclude
+    )
+    return stream_response(users, export_format, exclude_unset=projection.requested)
 
 
 @router.post(
@@ -52,20 +89,23 @@ async def create_user(
 
 @router.get(
     path="/{id_}",
-    response_model=schema.UserResponseSchema,
     status_code=status.HTTP_200_OK,
+    responses={status.HTTP_200_OK: {"model": schema.UserResponseSchema}},
     dependencies=[Depends(AuthDependency())],
 )
 async def get_user(
     id_: PyObjectId,
+    projection: ProjectionQuery = Depends(),
     database_session=Depends(get_database),
 ):
-    user = await service.UserService(database_session).get(id_)
-    return schema.UserResponseSchema(
+    user = await service.UserService(database_session).get(
+        id_, fields=projection.fields, exclude=projection.exclude, raw=True
+    )
+    response = DefaultResponse(
         status=ResponseStatus.SUCCESS,
         message="User acount successfully retrieved",
-        data=user,
     )
+    return response.document_response(user)
 
 
 @router.patch(
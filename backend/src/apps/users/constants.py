@@ -1,3 +1,5 @@
 MIN_PASSWORD_LENGTH = 6  # length of users password
 USER_DB_COLLLECTION_NAME = "USERS"
 DEVICE_DB_COLLECTION_NAME = "DEVICES"
+DEVICE_ID_CACHE_SIZE = 10000  # device ids known to exist
+DEVICE_ID_CACHE_TTL = 300  # seconds
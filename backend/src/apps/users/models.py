@@ -17,6 +17,7 @@ class DeviceModel(DbModel):
     device_model: Optional[str] = None
     device_brand: Optional[str] = None
     user_id: Optional[PyObjectId] = None
+    fingerprint: Optional[str] = None  # digest of the user and user agent details
 
 
 class UserModel(DbModel):
@@ -1,12 +1,31 @@
-from src.libs import BaseRepository
+from pymongo import ASCENDING, IndexModel
+
+from src.libs import BaseRepository, TTLCache, metrics_registry
 from . import models, constants
 
 
 class DeviceRepository(BaseRepository):
     model_klass = models.DeviceModel
     collection_name = constants.DEVICE_DB_COLLECTION_NAME
+    id_cache = TTLCache(
+        maxsize=constants.DEVICE_ID_CACHE_SIZE, ttl=constants.DEVICE_ID_CACHE_TTL
+    )
+    indexes = [
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        # devices are resolved by their fingerprint on every login
+        IndexModel(
+            [("fingerprint", ASCENDING)],
+            name="fingerprint_unique",
+            unique=True,
+            partialFilterExpression={"fingerprint": {"$type": "string"}},
+        ),
+    ]
 
 
 class UserRepository(BaseRepository):
     model_klass = models.UserModel
     collection_name = constants.USER_DB_COLLLECTION_NAME
+    indexes = [IndexModel([("email", ASCENDING)], name="email_unique", unique=True)]
+
+
+metrics_registry.register("device_id_cache", DeviceRepository.id_cache.stats)
@@ -1,14 +1,33 @@
+import hashlib
 from datetime import datetime
-from typing import Union, Optional
+from typing import Any, Mapping, Optional, Union
 
 from bson import ObjectId
 from pydantic import BaseModel, EmailStr, validator
 
-from src.libs import DefaultResponse, DbModel, PaginationModel, utils, PyObjectId
+from src.libs import DefaultResponse, DbModel, PaginationModel, PyObjectId
 from .models import DeviceModel
 from . import validators
 
 
+FINGERPRINT_FIELDS = (
+    "user_id",
+    "operating_system",
+    "browser",
+    "device_family",
+    "device_model",
+    "device_brand",
+)
+
+
+def device_fingerprint(device: Mapping[str, Any]) -> str:
+    """Digests the user and user agent details of a device, schema or stored document"""
+    parts = (device.get(field) for field in FINGERPRINT_FIELDS)
+    return hashlib.sha256(
+        "|".join("" if part is None else str(part) for part in parts).encode()
+    ).hexdigest()
+
+
 class DeviceDTOSchema(BaseModel):
     operating_system: Optional[str] = None
     browser: Optional[str] = None
@@ -22,6 +41,11 @@ class DeviceDTOSchema(BaseModel):
         arbitrary_types_allowed = True
         json_encoders = {ObjectId: str, datetime: lambda v: v.isoformat()}
 
+    @property
+    def fingerprint(self) -> str:
+        """Identifies a device of a user by its user agent details"""
+        return device_fingerprint(self.dict())
+
 
 class DeviceCreateSchema(DeviceDTOSchema):
     user_id: PyObjectId
@@ -44,7 +68,7 @@ class UserDTOSchema(BaseModel):
         if not value:
             return
         validators.password_validator(value)
-        return utils.get_string_hash(value)
+        return value
 
 
 class UserCreateSchema(UserDTOSchema):
@@ -1,6 +1,12 @@
-from fastapi.encoders import jsonable_encoder
+from typing import Any, Dict, Optional
 
-from src.libs import BaseService
+from bson import ObjectId
+from pydantic import BaseModel
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from src.config.dependencies.auth import invalidate_principals
+from src.libs import BaseService, exceptions, password_hasher
 from . import models, schema, repository
 
 
@@ -10,15 +16,121 @@ class DeviceService(BaseService):
     data_transfer_klass = schema.DeviceDTOSchema
     data_response_klass = models.DeviceModel
     model_klass = models.DeviceModel
-    unique_fields = ["operating_system", "browser", "device_family"]
+    # devices are unique per user through the fingerprint index
+    unique_fields = []
+
+    async def get_create(
+        self, request_instance: schema.DeviceCreateSchema
+    ) -> models.DeviceModel:
+        """Resolves the device of a user by its fingerprint, creating it when missing,
+        in one atomic round trip"""
+        fingerprint = request_instance.fingerprint
+        db_model_instance = self.model_klass(
+            **request_instance.dict(), fingerprint=fingerprint
+        )
+        return await self.repository.get_or_create(
+            {"fingerprint": fingerprint}, db_model_instance
+        )
+
+    async def create(
+        self,
+        request_instance: schema.DeviceCreateSchema,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> models.DeviceModel:
+        """Creates a device with the fingerprint logins resolve it by
+
+        Raises:
+            BadRequest: when the user already has a device with the same details
+        """
+        db_model_instance = self.model_klass(
+            **request_instance.dict(), fingerprint=request_instance.fingerprint
+        )
+        try:
+            db_result = await self.repository.create(db_model_instance, projection)
+        except DuplicateKeyError:
+            raise exceptions.BadRequest("Device with the same details already exists")
+        return self._to_response(db_result, projection)
+
+    async def update(
+        self,
+        id_: ObjectId,
+        update_instance: BaseModel,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> BaseModel:
+        """Updates a device, recomputing its fingerprint from the updated details
 
-    async def get_create(self, request_instance: schema.DeviceCreateSchema):
-        devices: list[models.DeviceModel] = await self.repository.search(
-            many=True, **jsonable_encoder(request_instance, exclude_none=True)
+        Raises:
+            BadRequest: when the user already has a device with the same details
+            NotFoundException: when no device with the id is found
+        """
+        update_data = update_instance.dict(exclude_none=True, exclude_unset=True)
+        device = await self.repository.get(id_, raw=True)
+        if device is None:
+            raise exceptions.NotFoundException(f"Object with id {id_} does not exist")
+        update_data["fingerprint"] = schema.device_fingerprint(
+            {**device, **update_data}
         )
-        if devices:
-            return devices[0]
-        return await self.create(request_instance=request_instance)
+        try:
+            db_result = await self.repository.update(id_, update_data, projection)
+        except DuplicateKeyError:
+            raise exceptions.BadRequest("Device with the same details already exists")
+        if db_result is None:
+            raise exceptions.NotFoundException(f"Object with id {id_} does not exist")
+        invalidate_principals(device_id=id_)
+        return self._to_response(db_result, projection)
+
+    async def delete(self, id_: ObjectId):
+        await super().delete(id_)
+        self.repository.id_cache.delete(id_)
+        invalidate_principals(device_id=id_)
+
+    async def backfill_fingerprints(self, batch_size: int = 500) -> Dict[str, int]:
+        """Sets the fingerprint of devices stored before devices had one.
+        Logins resolve devices by fingerprint, so a device without one would be
+        created again, leaving the rooms of the old device behind. Of devices
+        sharing a fingerprint, the oldest gets it and the others are reported.
+
+        Returns:
+            Dict[str, int]: counts of updated and duplicate devices
+        """
+        counts = {"updated": 0, "duplicates": 0}
+        collection = self.repository.collection
+        fingerprints = set()
+        operations = []
+
+        async def write():
+            try:
+                result = await collection.bulk_write(operations, ordered=False)
+                counts["updated"] += result.modified_count
+            except BulkWriteError as error:
+                # a device created by a login since the deploy already holds it
+                codes = [e.get("code") for e in error.details.get("writeErrors", [])]
+                if any(code != 11000 for code in codes):
+                    raise
+                counts["updated"] += error.details.get("nModified", 0)
+                counts["duplicates"] += len(codes)
+            operations.clear()
+
+        async for device in collection.find(
+            {"fingerprint": {"$not": {"$type": "string"}}},
+            projection={field: 1 for field in schema.FINGERPRINT_FIELDS},
+            sort=[("_id", 1)],
+        ):
+            fingerprint = schema.device_fingerprint(device)
+            if fingerprint in fingerprints:
+                counts["duplicates"] += 1
+                continue
+            fingerprints.add(fingerprint)
+            operations.append(
+                UpdateOne(
+                    {"_id": device["_id"]}, {"$set": {"fingerprint": fingerprint}}
+                )
+            )
+            if len(operations) >= batch_size:
+                await write()
+        if operations:
+            await write()
+        return counts
 
 
 class UserService(BaseService):
@@ -30,12 +142,30 @@ class UserService(BaseService):
     unique_fields = ["email"]
 
     async def create(
-        self, request_instance: schema.UserCreateSchema, **kwargs
+        self, request_instance: schema.UserCreateSchema, device_info: dict
     ) -> schema.BasicUserResponseSchema:
-        device_info: dict = kwargs["device_info"]
+        # hashing runs in the hasher pool, never on the event loop
+        request_instance = request_instance.copy(
+            update={"password": await password_hasher.hash(request_instance.password)}
+        )
         new_user = await super().create(request_instance)
         device_info["user_id"] = new_user.id
-        await DeviceService(self.database).create(
+        await DeviceService(self.database).get_create(
             schema.DeviceCreateSchema(**device_info)
         )
         return new_user
+
+    async def update(self, id_: ObjectId, update_instance: BaseModel) -> BaseModel:
+        if getattr(update_instance, "password", None):
+            update_instance = update_instance.copy(
+                update={
+                    "password": await password_hasher.hash(update_instance.password)
+                }
+            )
+        user = await super().update(id_, update_instance)
+        invalidate_principals(user_id=id_)
+        return user
+
+    async def delete(self, id_: ObjectId):
+        await super().delete(id_)
+        invalidate_principals(user_id=id_)
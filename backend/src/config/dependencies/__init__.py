@@ -1,3 +1,4 @@
-from .database import get_database
-from .auth import AuthDependency
+from .database import DatabaseClient, get_database
+from .auth import AuthDependency, invalidate_principals
 from .cache import Cache
+from .projection import ProjectionQuery
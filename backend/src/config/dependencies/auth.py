@@ -1,4 +1,6 @@
-from typing import TYPE_CHECKING, List, Union, TypeVar, Tuple
+import hashlib
+import time
+from typing import Optional
 
 from bson import ObjectId
 from fastapi import Depends
@@ -7,13 +9,29 @@ from jose import JWTError, jwt
 from pydantic import BaseModel
 
 from src.config.settings import Settings
-from src.libs import exceptions, utils
+from src.libs import TTLCache, exceptions, metrics_registry, utils
 
 from .database import get_database
 
 security_mechanism = HTTPBearer()
 app_settings = Settings()
 
+# verified principals keyed by token digest, tagged by the user and device they belong to
+principal_cache = TTLCache(
+    maxsize=app_settings.auth_cache_size, ttl=app_settings.auth_cache_ttl
+)
+metrics_registry.register("auth_principals", principal_cache.stats)
+
+
+def invalidate_principals(
+    user_id: Optional[ObjectId] = None, device_id: Optional[ObjectId] = None
+):
+    """Drops cached principals of a user or device after it changes"""
+    if user_id is not None:
+        principal_cache.invalidate_tag(("user", user_id))
+    if device_id is not None:
+        principal_cache.invalidate_tag(("device", device_id))
+
 
 class AuthDependency:
     """
@@ -30,15 +48,29 @@ class AuthDependency:
     ):
         from src.apps import users, auth as auth_module
 
+        token = auth.credentials
+        cache_key = hashlib.sha256(token.encode()).digest()
+        principal = principal_cache.get(cache_key)
+        if principal is not None:
+            return principal
         try:
-            token = auth.credentials
             payload = utils.decode_access_token(token)
-            await users.UserService(database).get(ObjectId(payload.get("_id")))
-            await users.DeviceService(database).get(
-                ObjectId([payload.get("device_id")])
-            )
-            return auth_module.UserTokenSchema(**payload)
+            user_id = ObjectId(payload.get("_id"))
+            device_id = ObjectId(payload.get("device_id"))
+            if not await users.UserRepository(database).exists(_id=user_id):
+                raise exceptions.NotFoundException("User not found")
+            if not await users.DeviceRepository(database).exists(_id=device_id):
+                raise exceptions.NotFoundException("Device not found")
+            principal = auth_module.UserTokenSchema(**payload)
         except (JWTError, exceptions.NotFoundException):
             if self.raise_exception:
                 raise exceptions.UnauthorizedException("Invalid Token")
             return
+        expires_in = payload["exp"] - time.time() if payload.get("exp") else None
+        principal_cache.set(
+            cache_key,
+            principal,
+            ttl=expires_in,
+            tags=[("user", user_id), ("device", device_id)],
+        )
+        return principal
@@ -1,6 +1,6 @@
 import json
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Iterable, Optional, Union
 
 import aioredis
 from decouple import config
@@ -9,20 +9,50 @@ from decouple import config
 class Cache:
     REDIS_HOST = f"redis://{config('REDIS_HOST')}"
     REDIS_PORT = config("REDIS_PORT")
+    MAX_CONNECTIONS = config("REDIS_MAX_CONNECTIONS", default=50, cast=int)
+    # seconds a command waits for a free connection once the pool is exhausted
+    POOL_TIMEOUT = config("REDIS_POOL_TIMEOUT", default=5, cast=int)
     EXPIRY_DURATION = timedelta(minutes=30)
 
+    _redis: Optional[aioredis.Redis] = None
+
+    @classmethod
+    async def connect(cls):
+        """Creates the process wide redis client and its connection pool"""
+        redis = cls._get_redis_instance()
+        await redis.ping()
+
+    @classmethod
+    async def close(cls):
+        """Closes the process wide redis client and disconnects its pool"""
+        if cls._redis is not None:
+            await cls._redis.close()
+            await cls._redis.connection_pool.disconnect()
+            cls._redis = None
+
+    @classmethod
+    def get_client(cls) -> aioredis.Redis:
+        """Returns the process wide pooled redis client"""
+        return cls._get_redis_instance()
+
     @classmethod
-    def _get_redis_instance(cls):
-        return aioredis.from_url(
-            url=f"{cls.REDIS_HOST}:{cls.REDIS_PORT}",
-        )
+    def _get_redis_instance(cls) -> aioredis.Redis:
+        if cls._redis is None:
+            # commands wait for a connection during bursts instead of failing
+            connection_pool = aioredis.BlockingConnectionPool.from_url(
+                url=f"{cls.REDIS_HOST}:{cls.REDIS_PORT}",
+                max_connections=cls.MAX_CONNECTIONS,
+                timeout=cls.POOL_TIMEOUT,
+            )
+            cls._redis = aioredis.Redis(connection_pool=connection_pool)
+        return cls._redis
 
     @classmethod
     def __datetime_parser(cls, dct: dict):
         for k, v in dct.items():
             if isinstance(v, str) and v.endswith("+00:00"):
                 try:
-                    dct[k] = datetime.datetime.fromisoformat(v)
+                    dct[k] = datetime.fromisoformat(v)
                 except:
                     pass
         return dct
@@ -32,23 +62,106 @@ class Cache:
         return v.isoformat() if isinstance(v, datetime) else v
 
     @classmethod
-    async def get(cls, key: str) -> Optional[dict]:
-        redis = cls._get_redis_instance()
-        current_hour_stats = await redis.get(key)
+    def _loads(cls, value: Optional[bytes]) -> Optional[dict]:
+        if value:
+            return json.loads(value, object_hook=cls.__datetime_parser)
+
+    @classmethod
+    def _dumps(cls, data) -> str:
+        return json.dumps(data, default=cls.__serialize_dates)
 
-        if current_hour_stats:
-            return json.loads(current_hour_stats, object_hook=cls.__datetime_parser)
+    @classmethod
+    async def get(cls, key: str, refresh: bool = False) -> Optional[dict]:
+        """Retrieves a cached value
+
+        Args:
+            key (str): key of the cached value
+            refresh (bool): resets the expiry of the key in the same round trip
+
+        Returns:
+            Optional[dict]: cached value, None when key does not exist
+        """
+        redis = cls._get_redis_instance()
+        if not refresh:
+            return cls._loads(await redis.get(key))
+        pipe = redis.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.expire(key, cls.EXPIRY_DURATION)
+        value, _ = await pipe.execute()
+        return cls._loads(value)
 
     @classmethod
     async def set(cls, data, key: str):
         redis = cls._get_redis_instance()
-        await redis.set(
-            key,
-            json.dumps(data, default=cls.__serialize_dates),
-            ex=cls.EXPIRY_DURATION,
-        )
+        await redis.set(key, cls._dumps(data), ex=cls.EXPIRY_DURATION)
 
     @classmethod
     async def remove(cls, key: str):
-        redis = await cls._get_redis_instance()
+        redis = cls._get_redis_instance()
         await redis.delete(key)
+
+    @classmethod
+    async def get_many(
+        cls, keys: Iterable[str], refresh: bool = False
+    ) -> dict[str, Optional[dict]]:
+        """Retrieves multiple cached values in one round trip
+
+        Args:
+            keys (Iterable[str]): keys of the cached values
+            refresh (bool): resets the expiry of every found key in the same round trip
+
+        Returns:
+            dict[str, Optional[dict]]: cached values by key, None for missing keys
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        redis = cls._get_redis_instance()
+        pipe = redis.pipeline(transaction=False)
+        pipe.mget(keys)
+        if refresh:
+            for key in keys:
+                pipe.expire(key, cls.EXPIRY_DURATION)
+        values = (await pipe.execute())[0]
+        return {key: cls._loads(value) for key, value in zip(keys, values)}
+
+    @classmethod
+    async def set_many(
+        cls, mapping: dict[str, Any], expiry: Union[int, timedelta, None] = None
+    ):
+        """Caches multiple values with an expiry in one round trip
+
+        Args:
+            mapping (dict[str, Any]): values to cache by key
+            expiry (Union[int, timedelta, None]): expiry of the keys, defaults to EXPIRY_DURATION
+        """
+        if not mapping:
+            return
+        redis = cls._get_redis_instance()
+        pipe = redis.pipeline(transaction=False)
+        for key, data in mapping.items():
+            pipe.set(key, cls._dumps(data), ex=expiry or cls.EXPIRY_DURATION)
+        await pipe.execute()
+
+    @classmethod
+    async def refresh(
+        cls, keys: Iterable[str], expiry: Union[int, timedelta, None] = None
+    ) -> dict[str, bool]:
+        """Resets the expiry of multiple keys in one round trip
+
+        Args:
+            keys (Iterable[str]): keys to refresh
+            expiry (Union[int, timedelta, None]): new expiry of the keys, defaults to EXPIRY_DURATION
+
+        Returns:
+            dict[str, bool]: whether each key existed and was refreshed
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        redis = cls._get_redis_instance()
+        pipe = redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.expire(key, expiry or cls.EXPIRY_DURATION)
+        results = await pipe.execute()
+        return {key: bool(result) for key, result in zip(keys, results)}
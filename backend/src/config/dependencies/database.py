@@ -1,11 +1,140 @@
+import threading
+import time
+from typing import Optional
+
 import motor.motor_asyncio
+from pymongo import monitoring
 
 from src.config.settings import Settings
+from src.libs.metrics import Histogram, metrics_registry
 
 settings = Settings()
 
 
-def get_database():
-    """Retrieves database connection object"""
-    client = motor.motor_asyncio.AsyncIOMotorClient(settings.db_uri)
-    yield client[settings.db_name]
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """
+    Collects connection pool usage of the shared motor client.
+    Pool events are fired from the worker threads motor runs pymongo on,
+    so check out wait time is tracked per thread.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.wait_time = Histogram()
+        self.checked_out = 0
+        self.total_checkouts = 0
+        self.failed_checkouts = 0
+        self.connections_open = 0
+        self.pools_cleared = 0
+
+    def stats(self) -> dict:
+        return {
+            "checked_out": self.checked_out,
+            "total_checkouts": self.total_checkouts,
+            "failed_checkouts": self.failed_checkouts,
+            "connections_open": self.connections_open,
+            "pools_cleared": self.pools_cleared,
+            "wait_time": self.wait_time.snapshot(),
+        }
+
+    def _observe_wait(self) -> None:
+        started = getattr(self._local, "checkout_started", None)
+        if started is not None:
+            self.wait_time.observe(time.perf_counter() - started)
+            self._local.checkout_started = None
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_open -= 1
+
+    def connection_check_out_started(self, event):
+        self._local.checkout_started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._observe_wait()
+        with self._lock:
+            self.failed_checkouts += 1
+
+    def connection_checked_out(self, event):
+        self._observe_wait()
+        with self._lock:
+            self.checked_out += 1
+            self.total_checkouts += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+
+class DatabaseClient:
+    """
+    Holds the single motor client shared by every request of the process.
+    The client is created and warmed on application startup and closed on shutdown.
+    """
+
+    client: Optional[motor.motor_asyncio.AsyncIOMotorClient] = None
+    pool_stats = PoolStatsListener()
+
+    @classmethod
+    def _create_client(cls) -> motor.motor_asyncio.AsyncIOMotorClient:
+        return motor.motor_asyncio.AsyncIOMotorClient(
+            settings.db_uri,
+            maxPoolSize=settings.db_max_pool_size,
+            minPoolSize=settings.db_min_pool_size,
+            maxIdleTimeMS=settings.db_max_idle_time_ms,
+            waitQueueTimeoutMS=settings.db_wait_queue_timeout_ms,
+            connectTimeoutMS=settings.db_connect_timeout_ms,
+            serverSelectionTimeoutMS=settings.db_server_selection_timeout_ms,
+            socketTimeoutMS=settings.db_socket_timeout_ms,
+            event_listeners=[cls.pool_stats],
+        )
+
+    @classmethod
+    async def connect(cls) -> None:
+        """Creates the shared client and warms the pool with a round trip"""
+        if cls.client is None:
+            cls.client = cls._create_client()
+        await cls.client.admin.command("ping")
+
+    @classmethod
+    def close(cls) -> None:
+        """Closes the shared client and every pooled connection"""
+        if cls.client is not None:
+            cls.client.close()
+            cls.client = None
+
+    @classmethod
+    def get_database(cls) -> motor.motor_asyncio.AsyncIOMotorDatabase:
+        if cls.client is None:
+            cls.client = cls._create_client()
+        return cls.client[settings.db_name]
+
+
+metrics_registry.register("database_pool", DatabaseClient.pool_stats.stats)
+
+
+async def get_database():
+    """Retrieves database connection object.
+    Declared async so the dependency runs on the event loop instead of the threadpool"""
+    return DatabaseClient.get_database()
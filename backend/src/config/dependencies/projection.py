@@ -0,0 +1,26 @@
+from typing import Optional
+
+from fastapi import Query
+
+
+def _split(value: Optional[str]) -> list[str]:
+    return [field.strip() for field in (value or "").split(",") if field.strip()]
+
+
+class ProjectionQuery:
+    """
+    Reads the fields to include or leave out of a response from the query string,
+    as comma separated names e.g ?fields=id,email or ?exclude=devices
+    """
+
+    def __init__(
+        self,
+        fields: Optional[str] = Query(default=None),
+        exclude: Optional[str] = Query(default=None),
+    ):
+        self.fields = _split(fields)
+        self.exclude = _split(exclude)
+
+    @property
+    def requested(self) -> bool:
+        return bool(self.fields or self.exclude)
@@ -1,7 +1,6 @@
 from fastapi import status
-from fastapi.requests import Request
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from src.libs.exceptions import BaseHTTPException
 
@@ -14,7 +13,7 @@ class AppExceptionHandler:
         self.status_code = getattr(
             exception, "status_code", status.HTTP_500_INTERNAL_SERVER_ERROR
         )
-        self.headers = {}
+        self.headers = getattr(exception, "headers", None) or {}
 
     def raise_exception(self):
         """Raises the exception with the appropriate status code"""
@@ -27,19 +26,39 @@ class AppExceptionHandler:
         )
 
 
-class ExceptionHandlerMiddleware(BaseHTTPMiddleware):
+class ExceptionHandlerMiddleware:
+    """
+    Maps unhandled exceptions to the application error response.
+    Written as a pure ASGI middleware, so requests are not wrapped in an extra task
+    and streamed response bodies are passed straight through.
+    """
+
     def __init__(
         self,
-        app,
+        app: ASGIApp,
         some_attribute: str,
     ):
-        super().__init__(app)
+        self.app = app
         self.some_attribute = some_attribute
 
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_wrapper(message: Message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
         try:
-            # process the request and get the response
-            response = await call_next(request)
-            return response
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            return AppExceptionHandler(e).raise_exception()
+            # the error can no longer be reported once the response has begun
+            if response_started:
+                raise
+            response = AppExceptionHandler(e).raise_exception()
+            await response(scope, receive, send)
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseSettings, Field
 
 
@@ -6,12 +8,29 @@ class Settings(BaseSettings):
     debug: bool
     version: str = Field(default="v1")
     hash_scheme: str
+    hash_rounds: Optional[int] = Field(default=None)
+    hash_workers: int = Field(default=4)
     token_algorithm: str
     access_token_expire_minutes: int
+    auth_cache_size: int = Field(default=10000)
+    auth_cache_ttl: int = Field(default=60)
+    token_cache_size: int = Field(default=10000)
+    token_cache_ttl: int = Field(default=300)
+    user_agent_cache_size: int = Field(default=4096)
+    user_agent_warmup_file: Optional[str] = Field(default=None)
 
     # DATABASE VARS
     db_uri: str
     db_name: str
+    db_max_pool_size: int = Field(default=100)
+    db_min_pool_size: int = Field(default=10)
+    db_max_idle_time_ms: int = Field(default=60000)
+    db_wait_queue_timeout_ms: int = Field(default=5000)
+    db_connect_timeout_ms: int = Field(default=5000)
+    db_server_selection_timeout_ms: int = Field(default=5000)
+    db_socket_timeout_ms: Optional[int] = Field(default=None)
+    db_sync_indexes_on_startup: bool = Field(default=True)
+    media_chunk_size_bytes: int = Field(default=255 * 1024)
 
     class Config:
         env_file = ".env"
@@ -1,9 +1,15 @@
+from .caching import TTLCache
 from .decorators import *
 from .exceptions import *
 from .fields import *
+from .hashing import password_hasher
+from .indexes import IndexReport, reconcile_indexes
+from .metrics import Histogram, metrics_registry
 from .models import *
 from .repository import *
 from .service import *
+from .streaming import ExportFormat, file_response, stream_response
 from .typings import *
 from .utils import *
 from .websockets import websocket_emitter, WebsocketEvents
+from .outbox import event_outbox
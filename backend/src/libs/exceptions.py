@@ -74,6 +74,22 @@ class ForbiddenException(BaseHTTPException):
         return self.message
 
 
+class RangeNotSatisfiableException(BaseHTTPException):
+    """
+    Exception for when a requested byte range lies outside of a file
+    """
+
+    status_code = status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+
+    def __init__(self, message, length: int):
+        super().__init__(message)
+        self.message = message
+        self.headers = {"Content-Range": f"bytes */{length}"}
+
+    def __str__(self):
+        return self.message
+
+
 class UnauthorizedException(Exception):
     """
     Exception for when a user is not authorized
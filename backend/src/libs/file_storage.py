@@ -1,20 +1,63 @@
+import hashlib
 import io
-from typing import NoReturn, Optional, Type, Union
+from typing import AsyncIterator, NoReturn, Optional, Type, Union
 
 from bson import ObjectId
 from gridfs import errors as gridfs_errors
-from motor.motor_asyncio import AsyncIOMotorDatabase, AsyncIOMotorGridFSBucket
+from motor.motor_asyncio import (
+    AsyncIOMotorDatabase,
+    AsyncIOMotorGridFSBucket,
+    AsyncIOMotorGridOut,
+)
+from pydantic import BaseModel
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
 
-from .exceptions import NotFoundException
+from src.config import settings
+
+from .exceptions import BadRequest, InternalServerException, NotFoundException
+from .fields import PyObjectId
+
+
+class StoredFile(BaseModel):
+    id: PyObjectId
+    sha256: str
+    length: int
+    deduplicated: bool
 
 
 class FileSystem:
     """Serves as a file system handler for storing files.
-    Implementation uses gridfs for storing files directly on mongodb
+    Implementation uses gridfs for storing files directly on mongodb.
+    Streamed uploads are content addressed: files with the same sha256 are stored
+    once and reference counted in their metadata.
     """
 
-    def __init__(self, database: AsyncIOMotorDatabase):
-        self.fs = AsyncIOMotorGridFSBucket(database)
+    BUCKET_NAME = "fs"
+    CLOSE_ATTEMPTS = 3  # stores retried when a concurrent copy is deleted meanwhile
+    indexes = [
+        IndexModel(
+            [("metadata.sha256", ASCENDING)],
+            name="sha256_unique",
+            unique=True,
+            partialFilterExpression={"metadata.sha256": {"$type": "string"}},
+        )
+    ]
+
+    def __init__(
+        self, database: AsyncIOMotorDatabase, chunk_size_bytes: Optional[int] = None
+    ):
+        self.fs = AsyncIOMotorGridFSBucket(
+            database,
+            bucket_name=self.BUCKET_NAME,
+            chunk_size_bytes=chunk_size_bytes
+            or settings.Settings().media_chunk_size_bytes,
+        )
+        self.files = database[f"{self.BUCKET_NAME}.files"]
+        self.chunks = database[f"{self.BUCKET_NAME}.chunks"]
+
+    async def ensure_indexes(self) -> None:
+        await self.files.create_indexes(self.indexes)
 
     async def upload(self, file_name: str, file_bytes: bytes) -> ObjectId:
         """Uploads file bytes to file system
@@ -29,6 +72,85 @@ class FileSystem:
         file_id = await self.fs.upload_from_stream(file_name, file_bytes)
         return file_id
 
+    async def upload_stream(
+        self,
+        file_name: str,
+        chunks: AsyncIterator[bytes],
+        max_size: Optional[int] = None,
+    ) -> StoredFile:
+        """Streams chunks into the file system while hashing them, so the content is
+        never held in memory. When a file with the same content already exists, the
+        new copy is discarded and a reference is added to the existing one.
+        Stored files only hold content, names and media types given by each
+        uploader are kept by the caller.
+
+        Args:
+            file_name (str): title/name of the file be uploaded
+            chunks (AsyncIterator[bytes]): content of the file
+            max_size (Optional[int]): largest content in bytes, unbounded by default
+
+        Returns:
+            StoredFile: id, sha256 and length of the stored file
+
+        Raises:
+            BadRequest: when the content is larger than max_size, nothing is stored
+        """
+        grid_in = self.fs.open_upload_stream(file_name, metadata={"refcount": 1})
+        digest, length = hashlib.sha256(), 0
+        try:
+            async for chunk in chunks:
+                digest.update(chunk)
+                length += len(chunk)
+                if max_size is not None and length > max_size:
+                    raise BadRequest("File is too large")
+                await grid_in.write(chunk)
+        except BaseException:
+            await grid_in.abort()
+            raise
+        sha256 = digest.hexdigest()
+        existing_id = await self._add_reference(sha256)
+        if existing_id is not None:
+            await grid_in.abort()
+            return StoredFile(
+                id=existing_id, sha256=sha256, length=length, deduplicated=True
+            )
+        await grid_in.set("metadata", {"refcount": 1, "sha256": sha256})
+        for _ in range(self.CLOSE_ATTEMPTS):
+            try:
+                await grid_in.close()
+            except gridfs_errors.FileExists as error:
+                # gridfs reports the duplicate key of the files document as FileExists
+                if not self._is_sha256_conflict(error):
+                    await self.chunks.delete_many({"files_id": grid_in._id})
+                    raise
+            else:
+                return StoredFile(
+                    id=grid_in._id, sha256=sha256, length=length, deduplicated=False
+                )
+            # the same content was stored concurrently, keep the other copy
+            existing_id = await self._add_reference(sha256)
+            if existing_id is not None:
+                await self.chunks.delete_many({"files_id": grid_in._id})
+                return StoredFile(
+                    id=existing_id, sha256=sha256, length=length, deduplicated=True
+                )
+            # the other copy was deleted meanwhile, closing again stores this one
+        await self.chunks.delete_many({"files_id": grid_in._id})
+        raise InternalServerException("File could not be stored")
+
+    @staticmethod
+    def _is_sha256_conflict(error: gridfs_errors.FileExists) -> bool:
+        cause = error.__context__
+        return isinstance(cause, DuplicateKeyError) and "sha256_unique" in str(cause)
+
+    async def _add_reference(self, sha256: str) -> Optional[ObjectId]:
+        file_document = await self.files.find_one_and_update(
+            {"metadata.sha256": sha256},
+            {"$inc": {"metadata.refcount": 1}},
+            projection={"_id": 1},
+        )
+        return file_document["_id"] if file_document else None
+
     async def download(self, file_id: ObjectId) -> io.BytesIO:
         """Retrieves content of a file and saves in io buffer
 
@@ -49,19 +171,77 @@ class FileSystem:
         except gridfs_errors.NoFile:
             raise NotFoundException("File not found")
 
-    async def delete(self, file_id: ObjectId) -> None:
-        """Deletes a file from the file system
+    async def open_download(self, file_id: ObjectId) -> AsyncIOMotorGridOut:
+        """Opens a file for reading without loading its content
 
         Args:
             file_id (ObjectId): Id of the file
 
         Raises:
-            NotFoundException: When no such file with id is found
+            NotFoundException: When no file is found
 
         Returns:
-            None: On succesful delete
+            AsyncIOMotorGridOut: opened file, its length and metadata are loaded
         """
         try:
-            await self.fs.delete(file_id)
+            return await self.fs.open_download_stream(file_id)
         except gridfs_errors.NoFile:
             raise NotFoundException("File not found")
+
+    @staticmethod
+    async def stream(
+        grid_out: AsyncIOMotorGridOut, start: int = 0, end: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """Yields the content of an opened file one stored chunk at a time,
+        so memory is bounded by the chunk size
+
+        Args:
+            grid_out (AsyncIOMotorGridOut): file opened with open_download
+            start (int): first byte to read
+            end (Optional[int]): last byte to read, inclusive, the end of the file by default
+        """
+        end = grid_out.length - 1 if end is None else end
+        remaining = end - start + 1
+        grid_out.seek(start)
+        try:
+            while remaining > 0:
+                chunk = await grid_out.readchunk()
+                if not chunk:
+                    break
+                chunk = chunk[:remaining]
+                remaining -= len(chunk)
+                yield chunk
+        finally:
+            grid_out.close()
+
+    async def delete(self, file_id: ObjectId) -> None:
+        """Deletes a file from the file system.
+        Shared content only loses a reference until its last one is deleted
+
+        Args:
+            file_id (ObjectId): Id of the file
+
+        Raises:
+            NotFoundException: When no such file with id is found
+
+        Returns:
+            None: On succesful delete
+        """
+        while True:
+            shared = await self.files.find_one_and_update(
+                {"_id": file_id, "metadata.refcount": {"$gt": 1}},
+                {"$inc": {"metadata.refcount": -1}},
+                projection={"_id": 1},
+            )
+            if shared:
+                return
+            # only removed while it holds the last reference, a reference added
+            # concurrently makes the next pass decrement it instead
+            deleted = await self.files.delete_one(
+                {"_id": file_id, "metadata.refcount": {"$not": {"$gt": 1}}}
+            )
+            if deleted.deleted_count:
+                await self.chunks.delete_many({"files_id": file_id})
+                return
+            if not await self.files.count_documents({"_id": file_id}, limit=1):
+                raise NotFoundException("File not found")
@@ -0,0 +1,96 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from src.config import settings
+
+from . import utils
+from .metrics import Histogram, metrics_registry
+
+
+class PasswordHasher:
+    """
+    Runs password hashing and verification in a dedicated thread pool so they
+    never stall the event loop. The bcrypt backend releases the GIL while hashing,
+    so threads hash in parallel; at most max_workers hashes run at once and the
+    rest wait in the pool queue, which is measured as queue time.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        self.max_workers = max_workers
+        self.queue_time = Histogram()
+        self.duration = Histogram()
+        self.pending = 0
+        self.rehashed = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "pending": self.pending,
+            "rehashed": self.rehashed,
+            "queue_time": self.queue_time.snapshot(),
+            "duration": self.duration.snapshot(),
+        }
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="password-hasher"
+            )
+        return self._executor
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _run(self, func: Callable, *args) -> Any:
+        submitted = time.perf_counter()
+
+        def call():
+            started = time.perf_counter()
+            self.queue_time.observe(started - submitted)
+            try:
+                return func(*args)
+            finally:
+                self.duration.observe(time.perf_counter() - started)
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), call
+            )
+        finally:
+            self.pending -= 1
+
+    async def hash(self, value: str) -> str:
+        return await self._run(utils.get_string_hash, value)
+
+    async def verify(self, hash_value: str, plain_value: str) -> bool:
+        return await self._run(utils.verify_hash, hash_value, plain_value)
+
+    async def verify_and_update(
+        self, hash_value: str, plain_value: str
+    ) -> tuple[bool, Optional[str]]:
+        """Verifies a value against its hash, rehashing it when the hash is outdated
+
+        Args:
+            hash_value (str): stored hash
+            plain_value (str): value to verify
+
+        Returns:
+            tuple[bool, Optional[str]]: whether the value matches, and the new hash
+                when the stored one was made with outdated scheme parameters
+        """
+        verified, new_hash = await self._run(
+            utils.verify_and_update_hash, hash_value, plain_value
+        )
+        if new_hash is not None:
+            self.rehashed += 1
+        return verified, new_hash
+
+
+password_hasher = PasswordHasher(settings.Settings().hash_workers)
+metrics_registry.register("password_hashing", password_hasher.stats)
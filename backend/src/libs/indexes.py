@@ -0,0 +1,108 @@
+from typing import List, Type
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pydantic import BaseModel, Field
+from pymongo import IndexModel
+from pymongo.errors import OperationFailure
+
+from .repository import BaseRepository
+
+# options that make two indexes on the same keys behave differently
+INDEX_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+class IndexReport(BaseModel):
+    collection: str
+    missing: list[str] = Field(default_factory=list)
+    extra: list[str] = Field(default_factory=list)
+    changed: list[str] = Field(default_factory=list)
+    created: list[str] = Field(default_factory=list)
+    dropped: list[str] = Field(default_factory=list)
+    errors: list[str] = Field(default_factory=list)
+
+
+def _index_spec(index_document: dict) -> tuple:
+    keys = index_document["key"]
+    keys = keys.items() if isinstance(keys, dict) else keys
+    keys = tuple(
+        (field, int(direction) if isinstance(direction, float) else direction)
+        for field, direction in keys
+    )
+    options = tuple(
+        (option, index_document.get(option))
+        for option in INDEX_OPTIONS
+        if index_document.get(option) is not None
+    )
+    return keys, options
+
+
+async def reconcile_collection_indexes(
+    database: AsyncIOMotorDatabase,
+    repository_klass: Type[BaseRepository],
+    drop_extra: bool = False,
+    dry_run: bool = False,
+) -> IndexReport:
+    """Compares the indexes declared on a repository with the ones on its collection.
+    Missing indexes are built in the background. Indexes whose options changed are
+    only reported, since rebuilding them needs a drop.
+
+    Args:
+        database (AsyncIOMotorDatabase): database holding the collection
+        repository_klass (Type[BaseRepository]): repository declaring the indexes
+        drop_extra (bool): drops indexes on the collection that are not declared
+        dry_run (bool): only reports differences without changing anything
+
+    Returns:
+        IndexReport: differences found and the changes made
+    """
+    collection = database[repository_klass.collection_name]
+    report = IndexReport(collection=repository_klass.collection_name)
+    declared = {index.document["name"]: index for index in repository_klass.indexes}
+    existing = await collection.index_information()
+    existing.pop("_id_", None)
+
+    for name, index in declared.items():
+        if name not in existing:
+            report.missing.append(name)
+        elif _index_spec(index.document) != _index_spec(existing[name]):
+            report.changed.append(name)
+    report.extra = [name for name in existing if name not in declared]
+    if dry_run:
+        return report
+
+    missing_indexes = []
+    for name in report.missing:
+        index_document = dict(declared[name].document)
+        keys = list(index_document.pop("key").items())
+        missing_indexes.append(IndexModel(keys, background=True, **index_document))
+    if missing_indexes:
+        try:
+            report.created = await collection.create_indexes(missing_indexes)
+        except OperationFailure as error:
+            report.errors.append(str(error))
+    if drop_extra:
+        for name in report.extra:
+            await collection.drop_index(name)
+            report.dropped.append(name)
+    return report
+
+
+async def reconcile_indexes(
+    database: AsyncIOMotorDatabase, drop_extra: bool = False, dry_run: bool = False
+) -> List[IndexReport]:
+    """Reconciles the declared indexes of every registered repository
+
+    Args:
+        database (AsyncIOMotorDatabase): database holding the collections
+        drop_extra (bool): drops indexes on collections that are not declared
+        dry_run (bool): only reports differences without changing anything
+
+    Returns:
+        List[IndexReport]: report of every collection
+    """
+    return [
+        await reconcile_collection_indexes(
+            database, repository_klass, drop_extra=drop_extra, dry_run=dry_run
+        )
+        for repository_klass in BaseRepository.registry
+    ]
@@ -0,0 +1,99 @@
+import bisect
+import threading
+from typing import Any, Callable, Dict, Optional, Sequence
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+
+class Histogram:
+    """
+    Cumulative bucketed histogram for latency style observations.
+    Observations are recorded in seconds.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Records a single observation
+
+        Args:
+            value (float): observed value in seconds
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+            if value > self._max:
+                self._max = value
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Produces a serializable view of the histogram"""
+        with self._lock:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets, self._counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            buckets["+Inf"] = self._count
+            return {
+                "count": self._count,
+                "sum": self._sum,
+                "max": self._max,
+                "avg": self._sum / self._count if self._count else 0.0,
+                "buckets": buckets,
+            }
+
+
+class MetricsRegistry:
+    """
+    Process wide registry of metric collectors.
+    Each collector is a callable returning a serializable dict of its current stats.
+    """
+
+    def __init__(self) -> None:
+        self._collectors: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def register(self, name: str, collector: Callable[[], Dict[str, Any]]) -> None:
+        """Registers a collector under a name, replacing any previous one
+
+        Args:
+            name (str): name the collected stats are exposed under
+            collector (Callable): callable returning the stats
+        """
+        self._collectors[name] = collector
+
+    def collect(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """Collects the stats of every registered collector or a single one
+
+        Args:
+            name (Optional[str]): name of a single collector to read
+
+        Returns:
+            Dict[str, Any]: collected stats keyed by collector name
+        """
+        if name is not None:
+            collector = self._collectors.get(name)
+            return {name: collector()} if collector else {}
+        return {key: collector() for key, collector in self._collectors.items()}
+
+
+metrics_registry = MetricsRegistry()
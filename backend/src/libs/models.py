@@ -6,6 +6,7 @@ import orjson
 import pytz
 from bson import ObjectId
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field, root_validator
 
 from .fields import PyObjectId
@@ -19,6 +20,20 @@ def orjson_dumps(v, *, default):
     return orjson.dumps(v, default=default).decode()
 
 
+def orjson_default(value):
+    """Encodes bson types orjson does not support natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError
+
+
+class DocumentResponse(ORJSONResponse):
+    """ORJSONResponse able to encode raw mongo documents"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=orjson_default)
+
+
 class DbModel(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     created_at: datetime = Field(default=datetime.now().replace(tzinfo=pytz.utc))
@@ -62,21 +77,39 @@ class DefaultResponse(BaseModel):
     message: str
     data: Union[list, dict, BaseModel] = None
 
+    def document_response(
+        self, documents: Union[list, dict], status_code: int = 200
+    ) -> "DocumentResponse":
+        """Serializes the response with stored documents as its data.
+        The documents are encoded as read from the database, skipping model
+        and response_model validation, so only trusted reads should use it.
+        Routes returning it document their schema with responses= instead of
+        response_model, which is never applied to a returned response."""
+        content = self.dict(by_alias=True, exclude={"data"})
+        content["data"] = documents
+        return DocumentResponse(content=content, status_code=status_code)
+
+
+MAX_PAGE_SIZE = 100  # largest page the list endpoints serve
+
 
 class PaginationModel(DefaultResponse):
-    total_count: int
+    total_count: Optional[int] = None
     total_pages: Optional[int] = None
-    page: int
+    page: Optional[int] = None
     size: int
+    next_cursor: Optional[str] = None
     data: list[BaseModel] = []
 
     @root_validator
-    def total_pages(cls, data: dict) -> int:
+    def compute_total_pages(cls, data: dict) -> dict:
         total_count = data.get("total_count")
         size = data.get("size")
-        data["total_pages"] = 0
-        if total_count != 0:
-            data["total_pages"] = (total_count - 1) // size + 1
+        if total_count is None or not size:
+            data["total_pages"] = None
+        else:
+            data["total_pages"] = (total_count - 1) // size + 1 if total_count else 0
+        return data
 
     class Config:
         allow_population_by_field_name = True
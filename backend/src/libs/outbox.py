@@ -0,0 +1,369 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from decouple import config
+
+from .metrics import metrics_registry
+from .websockets import WebSocketEmitter, WebsocketEvents, websocket_emitter
+
+OutboxItem = Tuple[str, WebsocketEvents, Dict[str, Any], Optional[str]]
+
+
+class CircuitBreaker:
+    """
+    Stops delivery attempts after consecutive failures.
+    Once the reset timeout elapses, attempts are let through again;
+    a success closes the circuit and a failure opens it for another timeout.
+    """
+
+    CLOSED = "CLOSED"
+    OPEN = "OPEN"
+    HALF_OPEN = "HALF_OPEN"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def remaining(self) -> float:
+        """Seconds left before attempts are let through again"""
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if (
+            self.state == self.HALF_OPEN
+            or self.consecutive_failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+
+
+class EventOutbox:
+    """
+    Bounded outbox of websocket events, delivered channel by channel.
+    Every channel delivers its events one at a time in enqueue order, retrying a
+    failed event with exponential backoff before the next one, while up to
+    CONCURRENCY channels deliver at once so the emitter can fill its batches.
+    When the redis stream is enabled, events are persisted before delivery and
+    acknowledged once delivered, so pending events survive a restart, and events
+    left pending by a consumer that stopped are claimed by the live ones.
+    """
+
+    MAX_SIZE = config("OUTBOX_MAX_SIZE", default=10000, cast=int)
+    # deliveries in flight, sized so a full emitter batch can be formed
+    CONCURRENCY = config(
+        "OUTBOX_CONCURRENCY", default=WebSocketEmitter.BATCH_MAX_SIZE, cast=int
+    )
+    MAX_RETRIES = config("OUTBOX_MAX_RETRIES", default=5, cast=int)
+    BACKOFF_BASE = config("OUTBOX_BACKOFF_BASE", default=0.1, cast=float)
+    BACKOFF_MAX = config("OUTBOX_BACKOFF_MAX", default=10.0, cast=float)
+    BREAKER_THRESHOLD = config("OUTBOX_BREAKER_THRESHOLD", default=5, cast=int)
+    BREAKER_RESET_TIMEOUT = config(
+        "OUTBOX_BREAKER_RESET_TIMEOUT", default=5.0, cast=float
+    )
+    DRAIN_TIMEOUT = config("OUTBOX_DRAIN_TIMEOUT", default=5.0, cast=float)
+    STREAM_ENABLED = config("OUTBOX_REDIS_STREAM", default=False, cast=bool)
+    STREAM_KEY = config("OUTBOX_STREAM_KEY", default="websocket_outbox")
+    STREAM_GROUP = "websocket_outbox_workers"
+    # unique per worker process, so workers of a host never share pending entries
+    STREAM_CONSUMER = config(
+        "OUTBOX_CONSUMER_NAME", default=f"{socket.gethostname()}-{os.getpid()}"
+    )
+    # entries pending this long belong to a consumer that stopped
+    CLAIM_MIN_IDLE = config("OUTBOX_CLAIM_MIN_IDLE", default=300.0, cast=float)
+    CLAIM_INTERVAL = config("OUTBOX_CLAIM_INTERVAL", default=30.0, cast=float)
+
+    def __init__(self, emitter: WebSocketEmitter) -> None:
+        self.emitter = emitter
+        self.breaker = CircuitBreaker(
+            self.BREAKER_THRESHOLD, self.BREAKER_RESET_TIMEOUT
+        )
+        self.redis = None
+        self.enqueued = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.retries = 0
+        self.exhausted = 0
+        self.claimed = 0
+        self.depth = 0
+        self._channels: Dict[str, Deque[OutboxItem]] = {}
+        self._drainers: Dict[str, asyncio.Task] = {}
+        self._stream_ids: Set[str] = set()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._changed: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+        self._running = False
+        metrics_registry.register("outbox", self.stats)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "max_size": self.MAX_SIZE,
+            "channels": len(self._channels),
+            "enqueued": self.enqueued,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "retries": self.retries,
+            "exhausted": self.exhausted,
+            "claimed": self.claimed,
+            "circuit": self.breaker.state,
+        }
+
+    async def start(self, redis=None) -> None:
+        """Starts delivering events, and the stream reader when redis is given
+
+        Args:
+            redis: pooled redis client backing the outbox stream
+        """
+        self._slots = asyncio.Semaphore(self.CONCURRENCY)
+        self._changed = asyncio.Condition()
+        self._running = True
+        if self.STREAM_ENABLED and redis is not None:
+            self.redis = redis
+            try:
+                await redis.xgroup_create(
+                    self.STREAM_KEY, self.STREAM_GROUP, id="0", mkstream=True
+                )
+            except Exception as error:
+                if "BUSYGROUP" not in str(error):
+                    raise
+            self._tasks.append(asyncio.create_task(self._read_stream()))
+            self._tasks.append(asyncio.create_task(self._claim_stale()))
+        for channel in self._channels:
+            self._start_drainer(channel)
+
+    async def stop(self) -> None:
+        """Waits for queued events to drain, then stops delivering"""
+        if self._running and self.depth:
+            try:
+                async with self._changed:
+                    await asyncio.wait_for(
+                        self._changed.wait_for(lambda: not self.depth),
+                        self.DRAIN_TIMEOUT,
+                    )
+            except asyncio.TimeoutError:
+                pass
+        self._running = False
+        tasks = self._tasks + list(self._drainers.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._drainers = {}
+        self.redis = None
+
+    async def enqueue(
+        self, channel: str, event: WebsocketEvents, data: Dict[str, Any]
+    ) -> bool:
+        """Adds an event to the outbox without waiting for its delivery
+
+        Args:
+            channel (str): channel the event is published to
+            event (WebsocketEvents): event being published
+            data (Dict[str, Any]): event payload
+
+        Returns:
+            bool: False when the outbox is full and the event was dropped
+        """
+        if self.redis is not None:
+            # the stream is never trimmed, delivered entries are deleted instead,
+            # so its length is the number of undelivered events
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.xadd(
+                self.STREAM_KEY,
+                {"channel": channel, "event": event.value, "data": json.dumps(data)},
+            )
+            pipe.xlen(self.STREAM_KEY)
+            entry_id, length = await pipe.execute()
+            if length > self.MAX_SIZE:
+                await self.redis.xdel(self.STREAM_KEY, entry_id)
+                self.dropped += 1
+                return False
+            self.enqueued += 1
+            return True
+        if self.depth >= self.MAX_SIZE:
+            self.dropped += 1
+            return False
+        self._put((channel, event, data, None))
+        self.enqueued += 1
+        return True
+
+    def _put(self, item: OutboxItem) -> None:
+        channel, stream_id = item[0], item[3]
+        if stream_id is not None:
+            self._stream_ids.add(stream_id)
+        pending = self._channels.get(channel)
+        if pending is None:
+            pending = self._channels[channel] = deque()
+        pending.append(item)
+        self.depth += 1
+        if self._running and channel not in self._drainers:
+            self._start_drainer(channel)
+
+    def _start_drainer(self, channel: str) -> None:
+        self._drainers[channel] = asyncio.create_task(self._drain(channel))
+
+    async def _drain(self, channel: str) -> None:
+        pending = self._channels[channel]
+        try:
+            while pending:
+                await self._deliver(pending[0])
+                _, _, _, stream_id = pending.popleft()
+                self._stream_ids.discard(stream_id)
+                self.depth -= 1
+                async with self._changed:
+                    self._changed.notify_all()
+        finally:
+            if not pending:
+                del self._channels[channel]
+            self._drainers.pop(channel, None)
+
+    async def _wait_for_room(self) -> int:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.depth < self.MAX_SIZE)
+        return self.MAX_SIZE - self.depth
+
+    async def _read_stream(self) -> None:
+        # pending entries of this consumer are replayed before reading new ones
+        stream_id, replaying = "0", True
+        while True:
+            try:
+                room = await self._wait_for_room()
+                response = await self.redis.xreadgroup(
+                    self.STREAM_GROUP,
+                    self.STREAM_CONSUMER,
+                    {self.STREAM_KEY: stream_id},
+                    count=min(room, 100),
+                    block=1000,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await asyncio.sleep(self.BACKOFF_BASE)
+                continue
+            entries = response[0][1] if response else []
+            if replaying and not entries:
+                stream_id, replaying = ">", False
+            for entry_id, fields in entries:
+                self._put_entry(self._decode(entry_id), fields)
+            if replaying and entries:
+                stream_id = self._decode(entries[-1][0])
+
+    async def _claim_stale(self) -> None:
+        while True:
+            await asyncio.sleep(self.CLAIM_INTERVAL)
+            try:
+                await self._claim_entries()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                continue
+
+    async def _claim_entries(self) -> None:
+        """Takes over entries left pending by consumers that stopped"""
+        start = "0-0"
+        while True:
+            room = await self._wait_for_room()
+            # aioredis has no helper for XAUTOCLAIM (redis 6.2+)
+            response = await self.redis.execute_command(
+                "XAUTOCLAIM",
+                self.STREAM_KEY,
+                self.STREAM_GROUP,
+                self.STREAM_CONSUMER,
+                int(self.CLAIM_MIN_IDLE * 1000),
+                start,
+                "COUNT",
+                min(room, 100),
+            )
+            start, entries = self._decode(response[0]), response[1]
+            for entry_id, fields in entries:
+                entry_id = self._decode(entry_id)
+                if fields is None:
+                    # trimmed or deleted before it was delivered
+                    await self.redis.xack(self.STREAM_KEY, self.STREAM_GROUP, entry_id)
+                    self.dropped += 1
+                    continue
+                if entry_id in self._stream_ids:
+                    continue
+                if isinstance(fields, list):
+                    fields = dict(zip(fields[::2], fields[1::2]))
+                self._put_entry(entry_id, fields)
+                self.claimed += 1
+            if start == "0-0":
+                return
+
+    def _put_entry(self, entry_id: str, fields: Dict[Any, Any]) -> None:
+        fields = {self._decode(k): self._decode(v) for k, v in fields.items()}
+        self._put(
+            (
+                fields["channel"],
+                WebsocketEvents(fields["event"]),
+                json.loads(fields["data"]),
+                entry_id,
+            )
+        )
+
+    @staticmethod
+    def _decode(value) -> str:
+        return value.decode() if isinstance(value, bytes) else value
+
+    async def _deliver(self, item: OutboxItem) -> None:
+        channel, event, data, stream_id = item
+        attempt = 0
+        while True:
+            if self.breaker.state == CircuitBreaker.OPEN:
+                await asyncio.sleep(self.breaker.remaining())
+                continue
+            try:
+                async with self._slots:
+                    await self.emitter.publish(channel, event, data)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.breaker.record_failure()
+                attempt += 1
+                if attempt > self.MAX_RETRIES:
+                    self.exhausted += 1
+                    break
+                self.retries += 1
+                backoff = min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** (attempt - 1))
+                await asyncio.sleep(backoff * random.uniform(0.5, 1.0))
+            else:
+                self.breaker.record_success()
+                self.delivered += 1
+                break
+        if stream_id is not None and self.redis is not None:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.xack(self.STREAM_KEY, self.STREAM_GROUP, stream_id)
+            pipe.xdel(self.STREAM_KEY, stream_id)
+            try:
+                await pipe.execute()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # left pending, the entry is claimed and delivered again later
+                pass
+
+
+event_outbox = EventOutbox(websocket_emitter)
@@ -1,80 +1,308 @@
-from typing import Any, Dict, List, Optional, Tuple, Type, Union
-
+import base64
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
+
+import bson
+import pytz
 from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ASCENDING, IndexModel
 from pymongo.collection import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
+from .caching import TTLCache
+from .exceptions import BadRequest
 from .models import DbModel
 
 
+def encode_cursor(sort_field: str, document: dict) -> str:
+    """Encodes the sort key and id of the last listed document into an opaque cursor"""
+    position = {"id": document["_id"], "value": document.get(sort_field)}
+    return base64.urlsafe_b64encode(bson.encode(position)).decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Decodes an opaque cursor back into the position it was taken at
+
+    Raises:
+        BadRequest: when the cursor is malformed
+    """
+    try:
+        return bson.decode(base64.urlsafe_b64decode(cursor.encode()))
+    except Exception:
+        raise BadRequest("Invalid pagination cursor")
+
+
+def build_projection(
+    fields: Optional[Iterable[str]] = None, exclude: Optional[Iterable[str]] = None
+) -> Optional[Dict[str, Any]]:
+    """Builds a mongo projection from fields to include or exclude.
+    Inclusion wins when both are given, since mongo cannot mix them. _id is always kept.
+
+    Returns:
+        Optional[Dict[str, Any]]: projection, None when every field is fetched
+    """
+    excluded = set(exclude or ()) - {"_id"}
+    if fields:
+        return {field: 1 for field in fields if field not in excluded}
+    if excluded:
+        return {field: 0 for field in excluded}
+    return None
+
+
+def project_document(document: dict, projection: Dict[str, Any]) -> dict:
+    """Applies a mongo style inclusion or exclusion projection to a document"""
+    included = {field for field, value in projection.items() if value}
+    excluded = {field for field, value in projection.items() if not value}
+    if included:
+        included.add("_id")
+    return {
+        field: value
+        for field, value in document.items()
+        if field not in excluded and (not included or field in included)
+    }
+
+
 class BaseRepository:
     model_klass: Type[DbModel]
     collection_name: str
+    indexes: List[IndexModel] = []
+    # documents fetched per round trip when streaming a collection
+    stream_batch_size: int = 500
+
+    # every concrete repository, used to reconcile declared indexes
+    registry: List[Type["BaseRepository"]] = []
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if getattr(cls, "collection_name", None):
+            BaseRepository.registry.append(cls)
 
     def __init__(self, database):
         self.collection: AsyncIOMotorCollection = database[self.collection_name]
 
     async def list(
-        self, size: Optional[int], page: Optional[int], **filter_kwargs
-    ) -> tuple[int, list[DbModel]]:
+        self,
+        size: Optional[int],
+        page: Optional[int] = None,
+        cursor: Optional[str] = None,
+        sort_field: str = "_id",
+        sort_order: int = ASCENDING,
+        with_count: bool = True,
+        projection: Optional[Dict[str, Any]] = None,
+        raw: bool = False,
+        **filter_kwargs,
+    ) -> tuple[Optional[int], list[Union[DbModel, dict]], Optional[str]]:
         """Produces a list of entities of model class
 
+        Results are ordered by sort_field, then _id. When a cursor is given, the page
+        starts right after the position it encodes (keyset pagination), so deep pages
+        cost the same as the first one. Otherwise the page number is used.
+
         Args:
             size [int]: optional size used to paginate results from database
             page [int]: optional page used to denote page number to limit results from database
+            cursor [str]: optional cursor returned by a previous call to continue from
+            sort_field [str]: indexed field results are ordered by
+            sort_order [int]: pymongo.ASCENDING or pymongo.DESCENDING
+            with_count [bool]: computes the total count, estimated when nothing is filtered
+            projection [dict]: optional fields to fetch
+            raw [bool]: returns the documents as read, without building models
             filter_kwargs [dict]: keyword values used to search for entities on database
 
         Returns:
-            tuple[int, list[DbModel]: tuple of total results and paginated count
+            tuple[Optional[int], list[Union[DbModel, dict]], Optional[str]]: total count, paginated
+                results and the cursor of the next page, None when there is none
         """
-        db_results = self.collection.find(filter_kwargs)
-        total_count = await self.collection.count_documents(filter_kwargs)
-        if size and page:
-            if page == 1:
-                db_results = await db_results.limit(size).to_list(length=size)
-            else:
-                db_results = (
-                    await db_results.skip(size * page).limit(size).to_list(length=size)
-                )
-        objects = [self.model_klass(**result) for result in db_results]
-        return total_count, objects
-
-    async def get(self, id_: ObjectId) -> Optional[DbModel]:
+        query = filter_kwargs
+        if cursor:
+            query = {
+                "$and": [
+                    filter_kwargs,
+                    self._keyset_filter(cursor, sort_field, sort_order),
+                ]
+            }
+        sort = [(sort_field, sort_order)]
+        if sort_field != "_id":
+            sort.append(("_id", sort_order))
+        db_results = self.collection.find(query, projection=projection, sort=sort)
+        if size:
+            if page and page > 1 and not cursor:
+                db_results = db_results.skip(size * (page - 1))
+            # one extra document tells if a next page exists
+            db_results = await db_results.limit(size + 1).to_list(length=size + 1)
+        else:
+            db_results = await db_results.to_list(length=None)
+        next_cursor = None
+        if size and len(db_results) > size:
+            db_results = db_results[:size]
+            next_cursor = encode_cursor(sort_field, db_results[-1])
+        total_count = None
+        if with_count:
+            total_count = (
+                await self.collection.count_documents(filter_kwargs)
+                if filter_kwargs
+                else await self.collection.estimated_document_count()
+            )
+        if raw:
+            return total_count, db_results, next_cursor
+        objects = [self._to_model(result, projection) for result in db_results]
+        return total_count, objects, next_cursor
+
+    async def stream(
+        self,
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: Optional[int] = None,
+        **filter_kwargs,
+    ) -> AsyncIterator[DbModel]:
+        """Iterates over every matching entity in _id order, holding one batch at a time
+
+        Args:
+            projection [dict]: optional fields to fetch
+            batch_size [int]: documents fetched per round trip, stream_batch_size by default
+            filter_kwargs [dict]: keyword values used to search for entities on database
+
+        Yields:
+            DbModel: entities as they are read from the cursor
+        """
+        db_results = self.collection.find(
+            filter_kwargs, projection=projection, sort=[("_id", ASCENDING)]
+        ).batch_size(batch_size or self.stream_batch_size)
+        try:
+            async for result in db_results:
+                yield self._to_model(result, projection)
+        finally:
+            await db_results.close()
+
+    @staticmethod
+    def _keyset_filter(cursor: str, sort_field: str, sort_order: int) -> dict:
+        position = decode_cursor(cursor)
+        operator = "$gt" if sort_order == ASCENDING else "$lt"
+        if sort_field == "_id":
+            return {"_id": {operator: position["id"]}}
+        return {
+            "$or": [
+                {sort_field: {operator: position["value"]}},
+                {sort_field: position["value"], "_id": {operator: position["id"]}},
+            ]
+        }
+
+    async def get(
+        self,
+        id_: ObjectId,
+        projection: Optional[Dict[str, Any]] = None,
+        raw: bool = False,
+    ) -> Optional[Union[DbModel, dict]]:
         """Retrieves a single entity from database
 
         Args:
             id_ [ObjectId]: id of collection record to fetch
+            projection [dict]: optional fields to fetch
+            raw [bool]: returns the document as read, without building a model
 
         Returns:
             entity[model_klass]: instance of model klass being queried
             None: When No record is found
         """
-        db_result = await self.collection.find_one({"_id": id_})
+        db_result = await self.collection.find_one({"_id": id_}, projection=projection)
         if db_result:
-            return self.model_klass(**db_result)
+            return db_result if raw else self._to_model(db_result, projection)
         return None
 
-    async def search(self, many: bool = False, **filter_kwargs):
+    async def search(
+        self,
+        many: bool = False,
+        projection: Optional[Dict[str, Any]] = None,
+        **filter_kwargs,
+    ):
         """Searches for item that match filtered property
 
         Args:
             many [bool]: boolean to indicate result for many or single
+            projection [dict]: optional fields to fetch
             filter_kwargs [dict]: keyword values of fieds for filtering
         """
-        result_count = self.collection.count_documents(filter_kwargs)
         db_result: Union[dict, list] = (
-            await self.collection.find_one(filter_kwargs)
+            await self.collection.find_one(filter_kwargs, projection=projection)
             if not many
-            else await self.collection.find(filter_kwargs).to_list(result_count)
+            else await self.collection.find(
+                filter_kwargs, projection=projection
+            ).to_list(length=None)
         )
         if db_result:
             return (
-                self.model_klass(**db_result)
+                self._to_model(db_result, projection)
                 if not many
-                else [self.model_klass(**result) for result in db_result]
+                else [self._to_model(result, projection) for result in db_result]
             )
         return None
 
+    async def exists(self, **filter_kwargs) -> bool:
+        """Checks if any entity matches the filter without fetching it
+
+        Args:
+            filter_kwargs (dict): values to be used for filtering
+
+        Returns:
+            bool: True when a matching entity exists
+        """
+        db_result = await self.collection.find_one(filter_kwargs, projection={"_id": 1})
+        return db_result is not None
+
+    async def missing_ids(
+        self, ids: Iterable[ObjectId], cache: Optional[TTLCache] = None
+    ) -> Set[ObjectId]:
+        """Finds which ids have no entity, fetching nothing but the _id of found ones
+
+        Args:
+            ids (Iterable[ObjectId]): ids to check
+            cache (Optional[TTLCache]): cache of ids known to exist, checked first
+                and filled with the ids found
+
+        Returns:
+            Set[ObjectId]: ids with no matching entity
+        """
+        unknown_ids = set(ids)
+        if cache is not None:
+            unknown_ids = {id_ for id_ in unknown_ids if cache.get(id_) is None}
+        if not unknown_ids:
+            return set()
+        found_ids = {
+            document["_id"]
+            async for document in self.collection.find(
+                {"_id": {"$in": list(unknown_ids)}}, projection={"_id": 1}
+            )
+        }
+        if cache is not None:
+            for id_ in found_ids:
+                cache.set(id_, True)
+        return unknown_ids - found_ids
+
+    async def exists_many(
+        self, ids: Iterable[ObjectId], cache: Optional[TTLCache] = None
+    ) -> bool:
+        """Checks that every id has an entity
+
+        Args:
+            ids (Iterable[ObjectId]): ids to check
+            cache (Optional[TTLCache]): cache of ids known to exist
+
+        Returns:
+            bool: True when all ids exist
+        """
+        return not await self.missing_ids(ids, cache)
+
     async def count(self, **filter_kwargs) -> int:
         """Gets the count of queried entities
 
@@ -86,38 +314,178 @@ class BaseRepository:
         """
         return await self.collection.count_documents(filter_kwargs)
 
-    async def create(self, model_instance: DbModel):
+    def _to_model(
+        self, document: dict, projection: Optional[Dict[str, Any]] = None
+    ) -> DbModel:
+        # projected documents are partial, so they are built without validation
+        if projection:
+            return self.model_klass.construct(**document)
+        return self.model_klass(**document)
+
+    async def create(
+        self,
+        model_instance: DbModel,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> DbModel:
         """
-        Adds entity to collection records
+        Adds entity to collection records.
+        The stored entity is built from the inserted document, without reading it back.
 
         Args:
             model_instance[model_klass]: Instance of model_klass to add
+            projection (Optional[Dict[str, Any]]): fields of the returned entity
 
         Returns:
             model_instance[model_klass]: Model Instance being added
         """
-        db_insert = await self.collection.insert_one(
-            model_instance.dict(exclude={"id"})
-        )
-        db_result = await self.get(db_insert.inserted_id)
-        return db_result
+        document = model_instance.dict(by_alias=True)
+        await self.collection.insert_one(document)
+        if projection:
+            return self._to_model(project_document(document, projection), projection)
+        return model_instance
 
-    async def update(self, id_: ObjectId, model_instance: DbModel):
+    async def get_or_create(
+        self,
+        filter_: Dict[str, Any],
+        model_instance: DbModel,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> DbModel:
+        """
+        Returns the entity matching the filter, inserting model_instance when none does,
+        in a single upsert. The filter should be backed by a unique index, so concurrent
+        upserts cannot insert twice; the one losing the race reads the winner's entity.
+
+        Args:
+            filter_ (Dict[str, Any]): filter identifying the entity
+            model_instance[model_klass]: entity inserted when none matches
+            projection (Optional[Dict[str, Any]]): fields of the returned entity
+
+        Returns:
+            model_instance[model_klass]: existing or inserted entity
+        """
+        document = model_instance.dict(by_alias=True)
+        for field in filter_:
+            document.pop(field, None)
+        try:
+            db_result = await self.collection.find_one_and_update(
+                filter_,
+                {"$setOnInsert": document},
+                projection=projection,
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            db_result = await self.collection.find_one(filter_, projection=projection)
+        return self._to_model(db_result, projection)
+
+    async def update(
+        self,
+        id_: ObjectId,
+        model_instance: Union[DbModel, Dict[str, Any]],
+        projection: Optional[Dict[str, Any]] = None,
+        filter_: Optional[Dict[str, Any]] = None,
+    ) -> Optional[DbModel]:
         """
-        Updates a model instance in the colelction
+        Updates a model instance in the collection and returns the updated
+        entity in the same round trip
 
         Args:
             id_ (str): id database model
-            model_instance (DbModel): update data
+            model_instance (Union[DbModel, Dict[str, Any]]): full update model or fields to set
+            projection (Optional[Dict[str, Any]]): fields of the returned entity
+            filter_ (Optional[Dict[str, Any]]): extra conditions the entity must match
 
         Returns:
             model_instance[model_klass]: Update Model Instance
+            None: When no record matches
+        """
+        update_data = (
+            model_instance.dict(exclude={"id"})
+            if isinstance(model_instance, DbModel)
+            else model_instance
+        )
+        return await self._modify_one(
+            {**(filter_ or {}), "_id": id_}, {"$set": {**update_data}}, projection
+        )
+
+    async def _modify_one(
+        self,
+        filter_: Dict[str, Any],
+        update: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Optional[DbModel]:
+        # every write path moves updated_at, whichever method issued it
+        update.setdefault("$set", {})["updated_at"] = datetime.now(tz=pytz.utc)
+        db_result = await self.collection.find_one_and_update(
+            filter_, update, projection=projection, return_document=ReturnDocument.AFTER
+        )
+        if db_result:
+            return self._to_model(db_result, projection)
+        return None
+
+    async def add_to_set(
+        self,
+        filter_: Dict[str, Any],
+        field: str,
+        values: List[Any],
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Optional[DbModel]:
+        """Atomically adds values missing from an array field of the first matching entity
+
+        Args:
+            filter_ (Dict[str, Any]): conditions the entity must match
+            field (str): name of the array field
+            values (List[Any]): values to add
+            projection (Optional[Dict[str, Any]]): fields of the returned entity
+
+        Returns:
+            The updated entity, or None if no entity matches the filter
+        """
+        return await self._modify_one(
+            filter_, {"$addToSet": {field: {"$each": values}}}, projection
+        )
+
+    async def push(
+        self,
+        filter_: Dict[str, Any],
+        field: str,
+        value: Any,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Optional[DbModel]:
+        """Atomically appends a value to an array field of the first matching entity
+
+        Args:
+            filter_ (Dict[str, Any]): conditions the entity must match
+            field (str): name of the array field
+            value (Any): value to append
+            projection (Optional[Dict[str, Any]]): fields of the returned entity
+
+        Returns:
+            The updated entity, or None if no entity matches the filter
+        """
+        return await self._modify_one(filter_, {"$push": {field: value}}, projection)
+
+    async def pull(
+        self,
+        filter_: Dict[str, Any],
+        field: str,
+        values: List[Any],
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> Optional[DbModel]:
+        """Atomically removes values from an array field of the first matching entity
+
+        Args:
+            filter_ (Dict[str, Any]): conditions the entity must match
+            field (str): name of the array field
+            values (List[Any]): values to remove
+            projection (Optional[Dict[str, Any]]): fields of the returned entity
+
+        Returns:
+            The updated entity, or None if no entity matches the filter
         """
-        await self.collection.update_one(
-            {"_id": id_}, {"$set": model_instance.dict(exclude={"id"})}
+        return await self._modify_one(
+            filter_, {"$pull": {field: {"$in": values}}}, projection
         )
-        db_result = await self.get(id_)
-        return db_result
 
     async def delete(self, id_: ObjectId) -> bool:
         """Deletes Entity from database
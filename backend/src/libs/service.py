@@ -1,13 +1,13 @@
-from typing import List, Optional, Type, Union
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Type, Union
 
 from bson import ObjectId
-from fastapi.encoders import jsonable_encoder
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from pydantic import BaseModel
+from pymongo.errors import DuplicateKeyError
 
 from .exceptions import BadRequest, NotFoundException
 from .models import DbModel
-from .repository import BaseRepository
+from .repository import BaseRepository, build_projection
 
 
 class BaseService:
@@ -22,50 +22,141 @@ class BaseService:
         self.database = database
         self.repository = self.repository_klass(database)
 
+    @property
+    def response_projection(self) -> Optional[Dict[str, Any]]:
+        """Projection of the fields serialized by the response klass,
+        None when it serializes every field of the model klass"""
+        model_fields = {field.alias for field in self.model_klass.__fields__.values()}
+        response_fields = {
+            field.alias for field in self.data_response_klass.__fields__.values()
+        }
+        if model_fields <= response_fields:
+            return None
+        return build_projection(model_fields & response_fields)
+
+    def get_projection(
+        self,
+        fields: Optional[Iterable[str]] = None,
+        exclude: Optional[Iterable[str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Maps requested fields of the response klass to a database projection
+
+        Args:
+            fields [Iterable[str]]: fields to include in the response
+            exclude [Iterable[str]]: fields to leave out of the response
+
+        Returns:
+            Optional[Dict[str, Any]]: projection, None when every field is requested
+
+        Raises:
+            BadRequest: when a field is not serialized by the response klass
+        """
+        if not fields and not exclude:
+            return None
+        response_fields = self.data_response_klass.__fields__
+        aliases = {}
+        for name in {*(fields or ()), *(exclude or ())}:
+            field = response_fields.get(name) or next(
+                (f for f in response_fields.values() if f.alias == name), None
+            )
+            if field is None:
+                raise BadRequest(f"Unknown field {name}")
+            aliases[name] = field.alias
+        return build_projection(
+            [aliases[name] for name in fields or ()]
+            or (self.response_projection or {}).keys()
+            or None,
+            [aliases[name] for name in exclude or ()],
+        )
+
     async def list(
-        self, size: Optional[int], page: Optional[int], **filter_kwargs
-    ) -> tuple[int, list[BaseModel]]:
+        self,
+        size: Optional[int],
+        page: Optional[int] = None,
+        cursor: Optional[str] = None,
+        with_count: bool = True,
+        fields: Optional[Iterable[str]] = None,
+        exclude: Optional[Iterable[str]] = None,
+        raw: bool = False,
+        **filter_kwargs,
+    ) -> tuple[Optional[int], list[Union[BaseModel, dict]], Optional[str]]:
         """List all entities
 
         Args:
             size [int]: optional size used to paginate results from database
             page [int]: optional page used to denote page number to limit results from database
+            cursor [str]: optional cursor of the next page returned by a previous call
+            with_count [bool]: computes the total count of entities
+            fields [Iterable[str]]: optional fields to include in each entity
+            exclude [Iterable[str]]: optional fields to leave out of each entity
+            raw [bool]: returns the stored documents without validating them, only
+                the fields serialized by the response klass are fetched
             filter_kwargs [dict]: keyword values used to search for entities on database
 
         Returns:
-            tuple[int, list[BaseModel]: tuple of total results and paginated count
+            tuple[Optional[int], list[Union[BaseModel, dict]], Optional[str]]: total
+                count, paginated results and cursor of the next page
         """
-        total_count, db_results = await self.repository.list(
-            size=size, page=page, **filter_kwargs
+        projection = self.get_projection(fields, exclude)
+        total_count, db_results, next_cursor = await self.repository.list(
+            size=size,
+            page=page,
+            cursor=cursor,
+            with_count=with_count,
+            projection=projection or self.response_projection,
+            raw=raw,
+            **filter_kwargs,
         )
-        responses = [self.data_response_klass(**result.dict()) for result in db_results]
-        return total_count, responses
+        if raw:
+            return total_count, db_results, next_cursor
+        responses = [self._to_response(result, projection) for result in db_results]
+        return total_count, responses, next_cursor
 
-    async def get(self, id_: ObjectId) -> BaseModel:
+    async def get(
+        self,
+        id_: ObjectId,
+        fields: Optional[Iterable[str]] = None,
+        exclude: Optional[Iterable[str]] = None,
+        raw: bool = False,
+    ) -> Union[BaseModel, dict]:
         """Get a particular entity
 
         Args:
             id_ [ObjectId]: primary key of entity
+            fields [Iterable[str]]: optional fields to include in the entity
+            exclude [Iterable[str]]: optional fields to leave out of the entity
+            raw [bool]: returns the stored document without validating it, only
+                the fields serialized by the response klass are fetched
 
         Returns:
-            BaseModel: pydantic object of entity from database
+            Union[BaseModel, dict]: pydantic object of entity from database
 
         Raises:
             NotFoundException: when no entity with primary key is found
         """
-        db_result = await self.repository.get(id_)
+        projection = self.get_projection(fields, exclude)
+        db_result = await self.repository.get(
+            id_, projection=projection or self.response_projection, raw=raw
+        )
         if db_result is None:
-            raise NotFoundException(f"Object with id {id} does not exist")
-        response = self.data_response_klass(**db_result.dict())
-        return response
+            raise NotFoundException(f"Object with id {id_} does not exist")
+        if raw:
+            return db_result
+        return self._to_response(db_result, projection)
 
     async def search(
-        self, many: bool = False, **filter_kwargs
+        self,
+        many: bool = False,
+        fields: Optional[Iterable[str]] = None,
+        exclude: Optional[Iterable[str]] = None,
+        **filter_kwargs,
     ) -> Union[BaseModel, List[BaseModel]]:
         """Search for a paticular entity in ther database
 
         Args:
             many[bool]: boolean flag to denote if multiple results or first result is returned
+            fields[Iterable[str]]: optional fields to include in each entity
+            exclude[Iterable[str]]: optional fields to leave out of each entity
             filter_kwargs[dict]: keyword values of fields and values to searh for
 
         Returns:
@@ -74,16 +165,52 @@ class BaseService:
         Raises:
             NotFoundException: when no result is found
         """
-        db_result = await self.repository.search(many=many, **filter_kwargs)
+        projection = self.get_projection(fields, exclude)
+        db_result = await self.repository.search(
+            many=many,
+            projection=projection or self.response_projection,
+            **filter_kwargs,
+        )
         if db_result is None:
             raise NotFoundException(f"Objects matching filters not found")
         response = (
-            self.data_response_klass(**db_result.dict())
+            self._to_response(db_result, projection)
             if not many
-            else [self.data_response_klass(**result.dict()) for result in db_result]
+            else [self._to_response(result, projection) for result in db_result]
         )
         return response
 
+    def stream(
+        self,
+        fields: Optional[Iterable[str]] = None,
+        exclude: Optional[Iterable[str]] = None,
+        **filter_kwargs,
+    ) -> AsyncIterator[BaseModel]:
+        """Streams every matching entity without loading the result set in memory.
+        Requested fields are checked before streaming starts.
+
+        Args:
+            fields [Iterable[str]]: optional fields to include in each entity
+            exclude [Iterable[str]]: optional fields to leave out of each entity
+            filter_kwargs [dict]: keyword values used to search for entities on database
+
+        Returns:
+            AsyncIterator[BaseModel]: pydantic object of each entity
+
+        Raises:
+            BadRequest: when a field is not serialized by the response klass
+        """
+        projection = self.get_projection(fields, exclude)
+        db_results = self.repository.stream(
+            projection=projection or self.response_projection, **filter_kwargs
+        )
+
+        async def responses():
+            async for db_result in db_results:
+                yield self._to_response(db_result, projection)
+
+        return responses()
+
     async def count(self, **filter_kwargs) -> int:
         """Gets a count of entities in database
 
@@ -96,11 +223,26 @@ class BaseService:
         """
         return await self.repository.count(**filter_kwargs)
 
-    async def create(self, request_instance: BaseModel) -> BaseModel:
+    def _to_response(
+        self, db_result: DbModel, projection: Optional[Dict[str, Any]] = None
+    ) -> BaseModel:
+        # projected entities are partial, so they are carried over without validation
+        if projection:
+            return self.data_response_klass.construct(
+                **db_result.dict(exclude_unset=True)
+            )
+        return self.data_response_klass(**db_result.dict())
+
+    async def create(
+        self,
+        request_instance: BaseModel,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> BaseModel:
         """Creates entity into database
 
         Args:
             request_instance[BaseModel]: pydantic object of entity data to insert into database
+            projection[dict]: optional fields of the returned entity
 
         Returns:
             BaseModel: pydantic object of data inserted
@@ -113,48 +255,60 @@ class BaseService:
             filter_kwargs = {
                 key: getattr(request_instance, key)
                 for key in self.unique_fields
-                if hasattr(request_instance, key) and key is not None
+                if getattr(request_instance, key, None) is not None
             }
-            if await self.repository.search(**filter_kwargs):
+            if filter_kwargs and await self.repository.exists(**filter_kwargs):
                 raise BadRequest(
                     "Cannot create data contains already exsiting unique properties"
                 )
-        db_result = await self.repository.create(db_model_instance)
-        response = self.data_response_klass(**db_result.dict())
-        return response
+        try:
+            db_result = await self.repository.create(db_model_instance, projection)
+        except DuplicateKeyError:
+            raise BadRequest(
+                "Cannot create data contains already exsiting unique properties"
+            )
+        return self._to_response(db_result, projection)
 
-    async def update(self, id_: ObjectId, update_instance: BaseModel) -> BaseModel:
+    async def update(
+        self,
+        id_: ObjectId,
+        update_instance: BaseModel,
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> BaseModel:
         """Updates entity data in database
 
         Args:
             id_[ObjectId]: primary key of entity to be updated
             update_instance [BaseModel]: data trasfer model object
+            projection[dict]: optional fields of the returned entity
 
         Returns:
             BaseModel: updated entity
 
         Raises:
             BadRequest: when unique data already exists in database
+            NotFoundException: when no entity with primary key is found
         """
-        instance = await self.get(id_)
+        update_data = update_instance.dict(exclude_none=True, exclude_unset=True)
         if self.unique_fields:
             filter_kwargs = {
-                key: getattr(update_instance, key)
+                key: update_data[key]
                 for key in self.unique_fields
-                if hasattr(update_instance, key)
+                if key in update_data
             }
-            searched_object = await self.repository.search(**filter_kwargs)
-            if not (searched_object and searched_object.id == id_):
+            if filter_kwargs and await self.repository.exists(
+                _id={"$ne": id_}, **filter_kwargs
+            ):
                 raise BadRequest(
                     "Cannot update data due to exisiting unique properties"
                 )
-        update_data = jsonable_encoder(
-            update_instance, exclude_none=True, exclude_unset=True
-        )
-        updated_instance = instance.copy(update_data)
-        db_result = await self.repository.update(id_, updated_instance)
-        response = self.data_response_klass(**db_result.dict())
-        return response
+        try:
+            db_result = await self.repository.update(id_, update_data, projection)
+        except DuplicateKeyError:
+            raise BadRequest("Cannot update data due to exisiting unique properties")
+        if db_result is None:
+            raise NotFoundException(f"Object with id {id_} does not exist")
+        return self._to_response(db_result, projection)
 
     async def delete(self, id_: ObjectId):
         """Deletes data from database
@@ -162,6 +316,5 @@ class BaseService:
         Args:
             id_[ObjectId]: primary key of entity to be removed
         """
-        if not await self.repository.get(id_):
+        if not await self.repository.delete(id_):
             raise NotFoundException(f"Object with id {id_} is not found")
-        await self.delete(id_)
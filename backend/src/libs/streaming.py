@@ -0,0 +1,167 @@
+from enum import Enum
+from typing import AsyncIterator, Optional, Tuple
+from urllib.parse import quote
+
+from bson import ObjectId
+from fastapi.requests import Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel
+
+from .exceptions import RangeNotSatisfiableException
+from .file_storage import FileSystem
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    JSON = "json"
+
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.JSON: "application/json",
+}
+
+
+async def encode_stream(
+    items: AsyncIterator[BaseModel],
+    export_format: ExportFormat,
+    exclude_unset: bool = False,
+) -> AsyncIterator[bytes]:
+    """Encodes each item as soon as it is produced, as a line of NDJSON
+    or an element of a JSON array"""
+    if export_format == ExportFormat.NDJSON:
+        async for item in items:
+            yield item.json(by_alias=True, exclude_unset=exclude_unset).encode() + b"\n"
+        return
+    separator = b"["
+    async for item in items:
+        yield separator + item.json(by_alias=True, exclude_unset=exclude_unset).encode()
+        separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+def stream_response(
+    items: AsyncIterator[BaseModel],
+    export_format: ExportFormat = ExportFormat.NDJSON,
+    exclude_unset: bool = False,
+) -> StreamingResponse:
+    """Streams items to the client with constant memory
+
+    Args:
+        items (AsyncIterator[BaseModel]): items to export
+        export_format (ExportFormat): NDJSON lines or a JSON array
+        exclude_unset (bool): leaves out fields that were not fetched
+    """
+    return StreamingResponse(
+        encode_stream(items, export_format, exclude_unset),
+        media_type=MEDIA_TYPES[export_format],
+    )
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Checks an If-None-Match header against an etag, with the weak comparison
+    the header calls for, so W/ prefixed tags added by proxies still match
+
+    Args:
+        if_none_match (Optional[str]): value of the If-None-Match header
+        etag (str): current etag of the resource
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque_tag = etag.removeprefix("W/")
+    return any(
+        tag.strip().removeprefix("W/") == opaque_tag for tag in if_none_match.split(",")
+    )
+
+
+def parse_range(range_header: Optional[str], length: int) -> Optional[Tuple[int, int]]:
+    """Parses a single byte range of a Range header
+
+    Args:
+        range_header (Optional[str]): value of the Range header
+        length (int): length of the file in bytes
+
+    Returns:
+        Optional[Tuple[int, int]]: first and last byte of the range, None when the
+            whole file is sent, as for missing, malformed or multiple ranges
+
+    Raises:
+        RangeNotSatisfiableException: when the range starts past the end of the file
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+    first, separator, last = range_header[len("bytes=") :].strip().partition("-")
+    if not separator or "," in last:
+        return None
+    if not (first or last).isdigit() or (last and not last.isdigit()):
+        # signs, as in bytes=--5, make the range malformed rather than unsatisfiable
+        return None
+    try:
+        if not first:
+            suffix_length = int(last)
+            start, end = max(length - suffix_length, 0), length - 1
+            if suffix_length == 0:
+                start = length
+        else:
+            start = int(first)
+            end = min(int(last), length - 1) if last else length - 1
+    except ValueError:
+        return None
+    if first and last and int(last) < start:
+        return None
+    if start >= length:
+        raise RangeNotSatisfiableException("Requested range not satisfiable", length)
+    return start, end
+
+
+async def file_response(
+    request: Request,
+    file_system: FileSystem,
+    file_id: ObjectId,
+    media_type: Optional[str] = None,
+    file_name: Optional[str] = None,
+    etag: Optional[str] = None,
+) -> Response:
+    """Streams a stored file, honouring Range, If-Range and If-None-Match headers
+
+    Args:
+        request (Request): request carrying the conditional and range headers
+        file_system (FileSystem): file system holding the file
+        file_id (ObjectId): id of the file
+        media_type (Optional[str]): media type of the content, binary by default
+        file_name (Optional[str]): name the content is served under
+        etag (Optional[str]): quoted entity tag, the sha256 of the content by default
+
+    Raises:
+        NotFoundException: when no file is found
+        RangeNotSatisfiableException: when the range starts past the end of the file
+    """
+    grid_out = await file_system.open_download(file_id)
+    metadata = grid_out.metadata or {}
+    etag = etag or f'"{metadata.get("sha256") or grid_out._id}"'
+    headers = {"ETag": etag, "Accept-Ranges": "bytes"}
+    if file_name:
+        headers["Content-Disposition"] = f"inline; filename*=UTF-8''{quote(file_name)}"
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        grid_out.close()
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    if request.headers.get("if-range", etag) == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), grid_out.length)
+        except RangeNotSatisfiableException:
+            grid_out.close()
+            raise
+    start, end = byte_range or (0, grid_out.length - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{grid_out.length}"
+    return StreamingResponse(
+        file_system.stream(grid_out, start, end),
+        status_code=206 if byte_range else 200,
+        media_type=media_type or "application/octet-stream",
+        headers=headers,
+    )
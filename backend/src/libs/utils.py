@@ -1,6 +1,8 @@
+import hashlib
 import random, string
+import time
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Iterable, Optional
 
 import user_agents
 from jose import JWTError, jwt
@@ -8,9 +10,25 @@ from passlib.context import CryptContext
 
 from src.config import settings
 from src.libs import exceptions
+from src.libs.caching import TTLCache
+from src.libs.metrics import metrics_registry
 
 settings_lib = settings.Settings()
-pwd_context = CryptContext(schemes=[settings_lib.hash_scheme], deprecated="auto")
+# hashes made with other rounds are flagged for an update, so they are rehashed on login
+hash_rounds = (
+    {f"{settings_lib.hash_scheme}__rounds": settings_lib.hash_rounds}
+    if settings_lib.hash_rounds
+    else {}
+)
+pwd_context = CryptContext(
+    schemes=[settings_lib.hash_scheme], deprecated="auto", **hash_rounds
+)
+# payloads of verified tokens, keyed by token digest and evicted at their exp
+token_cache = TTLCache(settings_lib.token_cache_size, settings_lib.token_cache_ttl)
+metrics_registry.register("verified_tokens", token_cache.stats)
+# parsed user agents keyed by the raw header, parsing is deterministic so entries never expire
+user_agent_cache = TTLCache(settings_lib.user_agent_cache_size)
+metrics_registry.register("user_agents", user_agent_cache.stats)
 
 
 def get_random_string(
@@ -37,6 +55,18 @@ def verify_hash(hash_value: str, plain_value: str):
     return pwd_context.verify(plain_value, hash_value)
 
 
+def verify_and_update_hash(
+    hash_value: str, plain_value: str
+) -> tuple[bool, Optional[str]]:
+    """Verifies a value against its hash, rehashing it when the hash is outdated
+
+    Returns:
+        tuple[bool, Optional[str]]: whether the value matches, and the new hash
+            when the stored one was made with outdated scheme parameters
+    """
+    return pwd_context.verify_and_update(plain_value, hash_value)
+
+
 def create_access_token(data: dict) -> str:
     """Generates JWT
 
@@ -69,21 +99,53 @@ def decode_access_token(token: str) -> dict:
     Raises:
         ForbiddenException: when jwt cannot be decoded
     """
+    cache_key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(cache_key)
+    if payload is not None:
+        return dict(payload)
     try:
         payload = jwt.decode(
             token, settings_lib.secret_key, algorithms=[settings_lib.token_algorithm]
         )
-        return payload
     except JWTError as e:
         raise exceptions.ForbiddenException(str(e))
+    # only verified tokens are cached, until they expire
+    expires_in = payload["exp"] - time.time() if payload.get("exp") else None
+    if expires_in is None or expires_in > 0:
+        token_cache.set(cache_key, payload, ttl=expires_in)
+    return dict(payload)
 
 
 def parse_user_agent(user_agent_header: str) -> dict[str, Any]:
-    user_agent = user_agents.parse(user_agent_header)
-    return {
-        "operating_system": user_agent.os.family,
-        "browser": user_agent.browser.family,
-        "device_family": user_agent.device.family,
-        "device_model": user_agent.device.model,
-        "device_brand": user_agent.device.brand,
-    }
+    """Parses the device details of a user agent header, memoized by header.
+    A copy is returned so callers can modify it."""
+    parsed = user_agent_cache.get(user_agent_header)
+    if parsed is None:
+        user_agent = user_agents.parse(user_agent_header)
+        parsed = {
+            "operating_system": user_agent.os.family,
+            "browser": user_agent.browser.family,
+            "device_family": user_agent.device.family,
+            "device_model": user_agent.device.model,
+            "device_brand": user_agent.device.brand,
+        }
+        user_agent_cache.set(user_agent_header, parsed)
+    return dict(parsed)
+
+
+def warm_user_agent_cache(user_agent_headers: Iterable[str]) -> int:
+    """Parses user agents ahead of requests
+
+    Args:
+        user_agent_headers (Iterable[str]): user agent headers, blank ones are skipped
+
+    Returns:
+        int: number of user agents parsed
+    """
+    count = 0
+    for user_agent_header in user_agent_headers:
+        user_agent_header = user_agent_header.strip()
+        if user_agent_header:
+            parse_user_agent(user_agent_header)
+            count += 1
+    return count
@@ -1,11 +1,15 @@
+import asyncio
+import time
 from enum import Enum
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
+import orjson
 from decouple import config
 from pydantic import BaseModel, Field
 
 from . import exceptions
+from .metrics import Histogram, metrics_registry
 
 
 class WebsocketEvents(str, Enum):
@@ -17,6 +21,167 @@ class WebsocketEvents(str, Enum):
     MEDIA_MESSAGE_PUBLISHED = "MEDIA_MESSAGE_PUBLISHED"
 
 
+class PublishBatcher:
+    """
+    Merges publishes issued within a short window into a single Centrifugo batch command.
+    The same payload published to several channels is sent as one broadcast.
+    Batches are flushed one after another, so the publish order of every channel is kept.
+    """
+
+    BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500)
+
+    def __init__(
+        self, emitter: "WebSocketEmitter", flush_interval: float, max_batch_size: int
+    ) -> None:
+        self.emitter = emitter
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.batch_size = Histogram(buckets=self.BATCH_SIZE_BUCKETS)
+        self.flush_latency = Histogram()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": self._queue.qsize() if self._queue else 0,
+            "batch_size": self.batch_size.snapshot(),
+            "flush_latency": self.flush_latency.snapshot(),
+        }
+
+    def start(self) -> None:
+        """Starts the background flush worker on the running event loop"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flushes pending publishes and stops the background flush worker"""
+        if self._worker is None:
+            return
+        if not self._worker.done():
+            self._queue.put_nowait(None)
+            await self._worker
+        self._worker = None
+
+    async def submit(self, channel: str, data: Dict[str, Any]) -> None:
+        """Queues data for a channel and waits for the batch carrying it to be sent
+
+        Args:
+            channel (str): prefixed name of the channel to publish to
+            data (Dict[str, Any]): payload to publish
+
+        Raises:
+            httpx.RequestError: When Centrifugo could not be reached
+            InternalServerException: When Centrifugo rejected the publish
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((channel, data, future))
+        await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        running = True
+        while running:
+            batch, item = [], await self._queue.get()
+            deadline = loop.time() + self.flush_interval
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.max_batch_size:
+                    break
+                if not self._queue.empty():
+                    item = self._queue.get_nowait()
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            running = item is not None
+            await self._flush(batch)
+
+    @staticmethod
+    def _group(batch: list) -> List[Tuple[List[str], Dict[str, Any], list]]:
+        """Groups identical payloads into broadcasts without reordering any channel.
+        A publish only joins an earlier group when its channel has no later command.
+        """
+        groups: List[Tuple[List[str], Dict[str, Any], list]] = []
+        group_by_payload: Dict[bytes, int] = {}
+        last_group_by_channel: Dict[str, int] = {}
+        for channel, data, future in batch:
+            payload_key = orjson.dumps(data, option=orjson.OPT_SORT_KEYS, default=str)
+            index = group_by_payload.get(payload_key)
+            if index is None or last_group_by_channel.get(channel, -1) >= index:
+                index = len(groups)
+                groups.append(([], data, []))
+                group_by_payload[payload_key] = index
+            channels, _, futures = groups[index]
+            channels.append(channel)
+            futures.append(future)
+            last_group_by_channel[channel] = index
+        return groups
+
+    @staticmethod
+    def _command(channels: List[str], data: Dict[str, Any]) -> Dict[str, Any]:
+        if len(channels) == 1:
+            return {
+                "method": "publish",
+                "params": {"channel": channels[0], "data": data},
+            }
+        return {"method": "broadcast", "params": {"channels": channels, "data": data}}
+
+    async def _flush(self, batch: list) -> None:
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            # building the command can fail too (an unencodable payload), and must
+            # fail the waiting publishes instead of the flush worker
+            groups = self._group(batch)
+            commands = [self._command(channels, data) for channels, data, _ in groups]
+            if len(commands) == 1:
+                command = commands[0]
+            else:
+                command = {"method": "batch", "params": {"commands": commands}}
+            response = await self.emitter._send_command(command)
+        except Exception as error:
+            self._resolve([future for _, _, future in batch], error)
+        else:
+            replies = self._replies(response, len(commands))
+            for (_, _, futures), reply in zip(groups, replies):
+                error = None
+                if response.get("status_code") != 200 or reply.get("error"):
+                    error = exceptions.InternalServerException("Websocket Failure")
+                self._resolve(futures, error)
+        finally:
+            self.batch_size.observe(len(batch))
+            self.flush_latency.observe(time.perf_counter() - started)
+
+    @staticmethod
+    def _replies(response: Dict[str, Any], count: int) -> List[Dict[str, Any]]:
+        message = response.get("message")
+        if not isinstance(message, dict):
+            return [{}] * count
+        if count == 1:
+            return [message]
+        replies = (message.get("result") or {}).get("replies") or message.get("replies")
+        if not isinstance(replies, list) or len(replies) != count:
+            return [{"error": message["error"]} if message.get("error") else {}] * count
+        return replies
+
+    @staticmethod
+    def _resolve(futures: list, error: Optional[Exception]) -> None:
+        for future in futures:
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+
 class WebSocketEmitter:
     """
     Serves as a wrapper for interfacing with centrifugo.
@@ -26,6 +191,17 @@ class WebSocketEmitter:
     HOST = "centrifugo"
     PORT = config("CENTRIFUGO_PORT")
     CHANNEL_PREFIX = "$"
+    HTTP2 = config("CENTRIFUGO_HTTP2", default=True, cast=bool)
+    MAX_CONNECTIONS = config("CENTRIFUGO_MAX_CONNECTIONS", default=20, cast=int)
+    MAX_KEEPALIVE_CONNECTIONS = config(
+        "CENTRIFUGO_MAX_KEEPALIVE_CONNECTIONS", default=10, cast=int
+    )
+    KEEPALIVE_EXPIRY = config("CENTRIFUGO_KEEPALIVE_EXPIRY", default=30.0, cast=float)
+    TIMEOUT = config("CENTRIFUGO_TIMEOUT", default=5.0, cast=float)
+    BATCH_FLUSH_INTERVAL_MS = config(
+        "CENTRIFUGO_BATCH_FLUSH_INTERVAL_MS", default=5, cast=float
+    )
+    BATCH_MAX_SIZE = config("CENTRIFUGO_BATCH_MAX_SIZE", default=100, cast=int)
 
     def __init__(self) -> None:
         self.address = f"https://{self.HOST}:{self.PORT}/api"
@@ -35,6 +211,48 @@ class WebSocketEmitter:
             "Content-type": "application/json",
             "Authorization": "apikey " + self.api_key,
         }
+        self.client: Optional[httpx.AsyncClient] = None
+        self.latency = Histogram()
+        self.failures = 0
+        self.batcher = PublishBatcher(
+            self,
+            flush_interval=self.BATCH_FLUSH_INTERVAL_MS / 1000,
+            max_batch_size=self.BATCH_MAX_SIZE,
+        )
+        metrics_registry.register("centrifugo", self.stats)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "failures": self.failures,
+            "latency": self.latency.snapshot(),
+            "batching": self.batcher.stats(),
+        }
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                http2=self.HTTP2,
+                headers=self.headers,
+                timeout=self.TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=self.MAX_CONNECTIONS,
+                    max_keepalive_connections=self.MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=self.KEEPALIVE_EXPIRY,
+                ),
+            )
+        return self.client
+
+    async def connect(self) -> None:
+        """Opens the long lived http client and starts the publish batcher"""
+        self._get_client()
+        self.batcher.start()
+
+    async def close(self) -> None:
+        """Flushes pending publishes and closes the long lived http client"""
+        await self.batcher.stop()
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
 
     async def _send_command(self, data: Dict[str, Any]) -> Dict[int, Any]:
         """
@@ -50,14 +268,15 @@ class WebSocketEmitter:
             Dict[int, Any]: The response from Centrifugo after executing the command sent
         """
 
+        started = time.perf_counter()
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url=self.address, json=data, headers=self.headers
-                )
-                return {"status_code": response.status_code, "message": response.json()}
+            response = await self._get_client().post(url=self.address, json=data)
+            return {"status_code": response.status_code, "message": response.json()}
         except httpx.RequestError as error:
+            self.failures += 1
             raise httpx.RequestError(error) from error
+        finally:
+            self.latency.observe(time.perf_counter() - started)
 
     async def publish(
         self,
@@ -67,6 +286,7 @@ class WebSocketEmitter:
     ) -> Dict[str, Any]:
         """
         Publish data into a channel.
+        Publishes are micro batched with other publishes issued in the same flush window.
 
         Args:
             channel (str): The name of the channel to publish to
@@ -77,22 +297,11 @@ class WebSocketEmitter:
             Dict[str, Any]: The formatted response after executing the command sent
         """
         data_publish = {"event": event.value, "data": data}
-
-        socket_data = {
-            "method": "publish",
-            "params": {
-                "channel": f"{self.CHANNEL_PREFIX}{channel}",
-                "data": data_publish,
-            },
-        }
         try:
-            response = await self._send_command(socket_data)
+            await self.batcher.submit(f"{self.CHANNEL_PREFIX}{channel}", data_publish)
         except httpx.RequestError as error:
             raise exceptions.InternalServerException("Error on websocket publish")
-        else:
-            if response and response.get("status_code") == 200:
-                return data_publish
-            raise exceptions.InternalServerException("Websocket Failure")
+        return data_publish
 
 
 websocket_emitter = WebSocketEmitter()
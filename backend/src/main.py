@@ -1,9 +1,24 @@
+import asyncio
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from src.apps import users, auth, rooms
+from src.apps import users, auth, rooms, messages
+from src.config.dependencies import Cache, DatabaseClient
 from src.config.middlewares.exception_handler import ExceptionHandlerMiddleware
 from src.config.settings import Settings
+from src.libs.file_storage import FileSystem
+from src.libs import (
+    event_outbox,
+    metrics_registry,
+    password_hasher,
+    reconcile_indexes,
+    utils,
+    websocket_emitter,
+)
+
+logger = logging.getLogger(__name__)
 
 # project wide settings
 settings = Settings()
@@ -28,11 +43,67 @@ app.add_middleware(
 )
 
 
+async def sync_indexes():
+    """Builds missing indexes declared on repositories without blocking startup"""
+    try:
+        reports = await reconcile_indexes(DatabaseClient.get_database())
+        await FileSystem(DatabaseClient.get_database()).ensure_indexes()
+    except Exception:
+        logger.exception("Index reconciliation failed")
+        return
+    for report in reports:
+        if report.created or report.extra or report.changed or report.errors:
+            logger.warning("Index reconciliation: %s", report.json())
+
+
+def warm_user_agents(path: str) -> int:
+    with open(path) as user_agents_file:
+        return utils.warm_user_agent_cache(user_agents_file)
+
+
+async def warm_user_agent_cache():
+    """Parses common user agents in a worker thread without blocking startup"""
+    try:
+        count = await asyncio.to_thread(
+            warm_user_agents, settings.user_agent_warmup_file
+        )
+    except OSError:
+        logger.exception("User agent warm up failed")
+        return
+    logger.info("Warmed user agent cache with %s user agents", count)
+
+
+@app.on_event("startup")
+async def startup():
+    await DatabaseClient.connect()
+    if settings.db_sync_indexes_on_startup:
+        app.state.index_sync = asyncio.create_task(sync_indexes())
+    if settings.user_agent_warmup_file:
+        app.state.user_agent_warmup = asyncio.create_task(warm_user_agent_cache())
+    await Cache.connect()
+    await websocket_emitter.connect()
+    await event_outbox.start(redis=Cache.get_client())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await event_outbox.stop()
+    await websocket_emitter.close()
+    DatabaseClient.close()
+    await Cache.close()
+    password_hasher.shutdown()
+
+
 @app.get(path="/ping")
 def ping():
     return {"message": "pong"}
 
 
+@app.get(path="/metrics")
+def metrics():
+    return metrics_registry.collect()
+
+
 app.include_router(auth.router, prefix=f"/api/{settings.version}", tags=["AUTH"])
 app.include_router(
     users.device_router, prefix=f"/api/{settings.version}", tags=["DEVICES"]
@@ -42,3 +113,6 @@ app.include_router(rooms.room_router, prefix=f"/api/{settings.version}", tags=["
 app.include_router(
     rooms.session_router, prefix=f"/api/{settings.version}", tags=["SESSION"]
 )
+app.include_router(
+    messages.message_router, prefix=f"/api/{settings.version}", tags=["MESSAGES"]
+)
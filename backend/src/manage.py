@@ -0,0 +1,74 @@
+"""
+Management commands for the backend.
+
+Usage (from the backend directory):
+    python -m src.manage indexes [--dry-run] [--drop-extra]
+    python -m src.manage fingerprints
+"""
+import argparse
+import asyncio
+import sys
+
+from src.apps import auth, messages, rooms, users  # registers every repository
+from src.config.dependencies import DatabaseClient
+from src.libs import reconcile_indexes
+from src.libs.file_storage import FileSystem
+
+
+async def sync_indexes(dry_run: bool, drop_extra: bool) -> int:
+    await DatabaseClient.connect()
+    try:
+        reports = await reconcile_indexes(
+            DatabaseClient.get_database(), drop_extra=drop_extra, dry_run=dry_run
+        )
+        if not dry_run:
+            await FileSystem(DatabaseClient.get_database()).ensure_indexes()
+    finally:
+        DatabaseClient.close()
+    for report in reports:
+        print(report.collection)
+        for field in ("missing", "extra", "changed", "created", "dropped", "errors"):
+            for name in getattr(report, field):
+                print(f"  {field:<8} {name}")
+    return 1 if any(report.errors for report in reports) else 0
+
+
+async def backfill_fingerprints() -> int:
+    await DatabaseClient.connect()
+    try:
+        counts = await users.DeviceService(
+            DatabaseClient.get_database()
+        ).backfill_fingerprints()
+    finally:
+        DatabaseClient.close()
+    print(f"devices updated     {counts['updated']}")
+    print(f"devices duplicated  {counts['duplicates']}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m src.manage")
+    commands = parser.add_subparsers(dest="command", required=True)
+    indexes = commands.add_parser(
+        "indexes", help="reconcile collection indexes with repository declarations"
+    )
+    indexes.add_argument(
+        "--dry-run", action="store_true", help="only report differences"
+    )
+    indexes.add_argument(
+        "--drop-extra", action="store_true", help="drop indexes that are not declared"
+    )
+    commands.add_parser(
+        "fingerprints",
+        help="set the fingerprint of devices stored before devices had one",
+    )
+    args = parser.parse_args()
+    if args.command == "indexes":
+        return asyncio.run(sync_indexes(args.dry_run, args.drop_extra))
+    if args.command == "fingerprints":
+        return asyncio.run(backfill_fingerprints())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())